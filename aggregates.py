@@ -0,0 +1,295 @@
+import numpy as np
+import pandas as pd
+
+from filter_index import ALL, get_filter_index, year_ranges
+from parallel import map_partitions
+from sketches import SKETCH_COLUMNS, HeavyHitters, build_sketches, merge_sketches, top_k
+from snapshot import GENRE_BIT, GENRE_MASK, WEEKDAY_ORDER, genre_columns, genre_flags
+
+# Row label used for rows without a year in the per-year tables.
+MISSING_YEAR = -1
+
+
+def _wide(dtype):
+    # Sums are kept as int64 / float64: the narrow source dtypes (Int32
+    # rating_count, float32 rating) would wrap or lose precision once totals
+    # from many rows are added up.
+    return np.int64 if pd.api.types.is_integer_dtype(dtype) else np.float64
+
+
+def _add_aligned(old, new):
+    total = old.add(new, fill_value=0)
+    if isinstance(old, pd.DataFrame):
+        return total.astype({col: _wide(dtype) for col, dtype in old.dtypes.items()})
+    return total.astype(_wide(old.dtype))
+
+
+# === Aggregate cube ===
+# One pre-reduced frame per genre (plus ALL), indexed by (year, title), with
+# the summed rating_count and the rating sum/count needed for averages. Every
+# title-level chart becomes a slice of this cube instead of a groupby over
+# raw rating rows.
+def _reduce(df):
+    # Summed as int64 / float64 (see _wide).
+    values = {}
+    if 'rating_count' in df.columns:
+        values['rating_count'] = df['rating_count'].to_numpy(dtype=np.int64, na_value=0)
+    if 'rating' in df.columns:
+        rating = df['rating'].to_numpy(dtype=np.float64, na_value=np.nan)
+        values['rating_sum'] = np.nan_to_num(rating)
+        values['rating_n'] = (~np.isnan(rating)).astype(np.int64)
+    keys = [c for c in ('year', 'title') if c in df.columns]
+    return df[keys].assign(**values).groupby(keys, observed=True, dropna=False).sum()
+
+
+# Columns the cube is built from (see parallel.map_partitions).
+CUBE_COLUMNS = ['year', 'title', 'rating_count', 'rating', GENRE_MASK]
+
+
+def build_cube(df):
+    cube = {ALL: _reduce(df)}
+    for genre in genre_columns(df):
+        cube[genre] = _reduce(df[(df[GENRE_MASK].to_numpy() & np.uint32(1 << GENRE_BIT[genre])) != 0])
+    return cube
+
+
+def merge_cube(old, new):
+    return {genre: _add_aligned(frame, new[genre]) for genre, frame in old.items()}
+
+
+def get_cube(dataset):
+    return dataset.derived('cube', lambda ds: map_partitions(ds.df, build_cube, merge_cube, CUBE_COLUMNS), merge_cube)
+
+
+def _genre_slice(dataset, genre):
+    cube = get_cube(dataset)
+    return cube.get(genre, cube[ALL])
+
+
+def _year_slice(frame, year):
+    if year == ALL:
+        return frame
+    years = frame.index.get_level_values('year')
+    return frame[years == int(year)]
+
+
+def _top_codes(codes, weights, titles, k):
+    # Top ``k`` titles by summed weight from per-row title codes (-1 for a
+    # missing title): a bincount per title and a partial top-k instead of a
+    # groupby and a full sort.
+    keep = codes >= 0
+    codes = codes[keep]
+    totals = np.bincount(codes, weights[keep], minlength=len(titles))
+    seen = np.flatnonzero(np.bincount(codes, minlength=len(titles)))
+    top = seen[top_k(totals[seen], k)]
+    return pd.DataFrame({'title': titles[top], 'rating_count': totals[top].astype(np.int64)})
+
+
+def _top(frame, k):
+    level = frame.index.names.index('title')
+    return _top_codes(frame.index.codes[level], frame['rating_count'].to_numpy(dtype=np.float64, na_value=0),
+                      frame.index.levels[level], k)
+
+
+# === Queries ===
+def top_titles(dataset, year=ALL, genre=ALL, k=6, tags=None, approximate=False):
+    if tags:
+        return tag_titles(dataset, tags, k, year, genre, approximate)
+    if approximate:
+        # A genre or year without ratings has no sketch and no top titles.
+        sketches = get_sketches(dataset)
+        if year == ALL:
+            sketch = sketches['genre'].get(genre)
+        else:
+            sketch = sketches['year_genre'].get((int(year), genre))
+        return (HeavyHitters() if sketch is None else sketch).top(k)
+    return _top(_year_slice(_genre_slice(dataset, genre), year), k)
+
+
+def trending_titles(dataset, years=5, k=10, approximate=False):
+    if approximate:
+        sketches = get_sketches(dataset)['year_genre']
+        latest = max((y for y, _ in sketches if y is not None), default=None)
+        if latest is None:
+            return HeavyHitters().top(k)
+        return HeavyHitters.combine(
+            s for (y, g), s in sketches.items() if g == ALL and y is not None and y >= latest - years).top(k)
+    frame = get_cube(dataset)[ALL]
+    year_values = frame.index.get_level_values('year')
+    return _top(frame[year_values >= year_values.max() - years], k)
+
+
+def rating_trend(dataset, genre=ALL):
+    by_year = _genre_slice(dataset, genre).groupby(level='year')[['rating_sum', 'rating_n']].sum()
+    return pd.DataFrame({'year': by_year.index, 'rating': (by_year['rating_sum'] / by_year['rating_n']).to_numpy()})
+
+
+# === Genre x year table ===
+# rating_count summed per genre for every year (rows without a year under
+# MISSING_YEAR), computed as one matrix-vector product of the genre flags
+# unpacked from the bitmask with rating_count per year range of the
+# year-sorted frame.
+GENRE_YEAR_COLUMNS = ['year', 'rating_count', GENRE_MASK]
+
+
+def build_genre_year_table(df, ranges=None):
+    if ranges is None:
+        ranges = year_ranges(df)
+    genres = genre_columns(df)
+    mask = df[GENRE_MASK].to_numpy() if genres else np.zeros(len(df), dtype=np.uint32)
+    counts = df['rating_count'].to_numpy(dtype=np.float64, na_value=0)
+
+    def block_totals(start, stop):
+        return counts[start:stop] @ genre_flags(mask[start:stop], genres).astype(np.float64)
+
+    rows = {year: block_totals(start, stop) for year, (start, stop) in ranges.items()}
+    missing_start = max((stop for _, stop in ranges.values()), default=0)
+    rows[MISSING_YEAR] = block_totals(missing_start, len(df))
+    return pd.DataFrame.from_dict(rows, orient='index', columns=genres).astype(np.int64)
+
+
+def get_genre_year_table(dataset):
+    return dataset.derived('genre_year', lambda ds: map_partitions(ds.df, build_genre_year_table, _add_aligned,
+                                                                   GENRE_YEAR_COLUMNS), _add_aligned)
+
+
+def genre_totals(dataset, genre_cols, year=ALL):
+    table = get_genre_year_table(dataset)
+    if year == ALL:
+        counts = table[genre_cols].sum()
+    elif int(year) in table.index:
+        counts = table.loc[int(year), genre_cols]
+    else:
+        counts = pd.Series(0, index=genre_cols)
+    genre_df = pd.DataFrame({'Genre': genre_cols, 'Rating Count': counts.to_numpy()})
+    return genre_df.sort_values(by='Rating Count', ascending=False)
+
+
+def tag_titles(dataset, tags, k=10, year=ALL, genre=ALL, approximate=False):
+    if approximate and year == ALL and genre == ALL:
+        sketches = get_sketches(dataset)['tag']
+        return HeavyHitters.combine(sketches[t] for t in tags if t in sketches).top(k)
+    if dataset.streamed:
+        if year != ALL or genre != ALL:
+            raise ValueError("a streamed dataset can only filter tag matches by tag")
+        counts = get_tag_title_counts(dataset)
+        counts = counts[counts.index.get_level_values('tag').isin(tags)]
+        return _top(counts.to_frame('rating_count'), k)
+    df = dataset.df
+    rows = get_filter_index(dataset).rows(year, genre, tags)
+    weights = df['rating_count'].to_numpy(dtype=np.float64, na_value=0)[rows]
+    return _top_codes(df['title'].array.codes[rows], weights, df['title'].cat.categories, k)
+
+
+# === Heavy-hitter sketches ===
+# Only built when a view asks for approximate top titles (see sketches.py); a
+# streamed dataset only has them if it was loaded with ``approximate``.
+def _build_sketches(dataset):
+    if dataset.streamed:
+        raise ValueError("a streamed dataset only has sketches when loaded with approximate=True")
+    return map_partitions(dataset.df, build_sketches, merge_sketches, SKETCH_COLUMNS)
+
+
+def get_sketches(dataset):
+    return dataset.derived('sketches', _build_sketches, merge_sketches)
+
+
+# === Tag x title counts ===
+# Only needed for streamed datasets, which have no rows for the filter index.
+def build_tag_title_counts(df):
+    counts = df['rating_count'].to_numpy(dtype=np.int64, na_value=0)
+    keys = ['tag', 'title']
+    return df[keys].assign(rating_count=counts).groupby(keys, observed=True)['rating_count'].sum()
+
+
+def get_tag_title_counts(dataset):
+    return dataset.derived('tag_title', lambda ds: build_tag_title_counts(ds.df), _add_aligned)
+
+
+# === Time rollup ===
+# Number of ratings per (year, month, weekday) cell, for all genres (ALL)
+# and per genre, built once at ingest. The monthly and weekly views sum a
+# slice of it, so they cost the same however many ratings there are. Rows
+# without a year are filed under MISSING_YEAR, rows without a month under
+# month 0 and rows without a weekday under weekday -1 (weekdays are
+# positions in WEEKDAY_ORDER).
+TIME_ROLLUP_COLUMNS = ['year', 'month', 'day_of_week', 'rating', GENRE_MASK]
+
+
+def has_time_rollup(df):
+    """Whether ``df`` has the columns the rollup is built from (the genre mask is optional)."""
+    return set(TIME_ROLLUP_COLUMNS[:-1]).issubset(df.columns)
+
+
+def month_key(year, month):
+    """Months since year 0, the unit of the date-range filter."""
+    return year * 12 + month - 1
+
+
+def build_time_rollup(df):
+    genres = genre_columns(df)
+    years = df['year'].to_numpy(dtype=np.int64, na_value=MISSING_YEAR)
+    months = df['month'].to_numpy(dtype=np.int64, na_value=0)
+    days = df['day_of_week'].cat.codes.to_numpy().astype(np.int64)
+    rated = df['rating'].notna().to_numpy()
+    # Dense cell number per row: year slot (0 for a missing year), then
+    # 13 month slots and 8 weekday slots.
+    known = years != MISSING_YEAR
+    first = years[known].min() if known.any() else 0
+    slots = np.where(known, years - first + 1, 0)
+    cells = (slots * 13 + months) * 8 + days + 1
+    size = (slots.max() + 1 if len(slots) else 1) * 13 * 8
+    table = {ALL: np.bincount(cells, rated, minlength=size)}
+    mask = df[GENRE_MASK].to_numpy() if genres else None
+    for genre in genres:
+        in_genre = rated & ((mask & np.uint32(1 << GENRE_BIT[genre])) != 0)
+        table[genre] = np.bincount(cells, in_genre, minlength=size)
+    used = np.flatnonzero(table[ALL])
+    slot, rest = np.divmod(used, 13 * 8)
+    index = pd.MultiIndex.from_arrays([np.where(slot > 0, slot + first - 1, MISSING_YEAR), rest // 8, rest % 8 - 1],
+                                      names=['year', 'month', 'day_of_week'])
+    return pd.DataFrame({key: counts[used] for key, counts in table.items()}, index=index).astype(np.int64)
+
+
+def get_time_rollup(dataset):
+    return dataset.derived('time_rollup', lambda ds: map_partitions(ds.df, build_time_rollup, _add_aligned,
+                                                                    TIME_ROLLUP_COLUMNS), _add_aligned)
+
+
+def rollup_months(dataset):
+    """Sorted month keys (see month_key) that have ratings, for the date-range slider."""
+    rollup = get_time_rollup(dataset)
+    years = rollup.index.get_level_values('year').to_numpy()
+    months = rollup.index.get_level_values('month').to_numpy()
+    known = (years != MISSING_YEAR) & (months > 0)
+    return sorted(set(month_key(years[known], months[known]).tolist()))
+
+
+def _time_slice(dataset, year, genre, dates):
+    rollup = get_time_rollup(dataset)
+    counts = rollup[genre if genre in rollup.columns else ALL]
+    years = rollup.index.get_level_values('year').to_numpy()
+    months = rollup.index.get_level_values('month').to_numpy()
+    keep = np.ones(len(rollup), dtype=bool)
+    if year != ALL:
+        keep &= years == int(year)
+    if dates is not None:
+        keys = month_key(years, months)
+        keep &= (years != MISSING_YEAR) & (months > 0) & (keys >= dates[0]) & (keys <= dates[1])
+    return counts[keep]
+
+
+def monthly_counts(dataset, year=ALL, genre=ALL, dates=None):
+    counts = _time_slice(dataset, year, genre, dates).groupby(level='month').sum()
+    counts = counts[(counts.index > 0) & (counts > 0)]
+    return pd.DataFrame({'month': counts.index.to_numpy(), 'rating_count': counts.to_numpy()})
+
+
+def weekly_counts(dataset, year=ALL, genre=ALL, dates=None):
+    counts = _time_slice(dataset, year, genre, dates).groupby(level='day_of_week').sum()
+    counts = counts[counts.index >= 0]
+    if not counts.any():
+        return pd.DataFrame({'day_of_week': [], 'rating_count': []})
+    totals = np.zeros(len(WEEKDAY_ORDER), dtype=np.int64)
+    totals[counts.index.to_numpy()] = counts.to_numpy()
+    return pd.DataFrame({'day_of_week': WEEKDAY_ORDER, 'rating_count': totals})
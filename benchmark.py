@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregates import get_cube, get_genre_year_table, get_sketches, get_time_rollup
+from dashboard_core import make_figure
+from data_loader import Dataset, sort_by_year
+from filter_index import get_filter_index
+from rendering import Chart
+from snapshot import GENRE_BIT, GENRE_COLS, GENRE_MASK, WEEKDAY_ORDER, read_csv_typed, read_snapshot, write_snapshot
+from views import VIEWS, filter_options
+
+# === Synthetic data ===
+# MovieLens-shaped rating rows: each movie has a fixed title, release year,
+# genre flags and rating_count; each rating row adds a user, a rating, an
+# optional tag and the month / weekday it was made. Movie popularity follows
+# a power law so top-k views behave like the real exports.
+def make_synthetic(rows, movies=5000, tags=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, movies + 1) ** 1.1
+    movie = rng.choice(movies, size=rows, p=popularity / popularity.sum())
+    movie_year = rng.integers(1950, 2019, movies)
+    movie_genres = rng.random((movies, len(GENRE_COLS))) < 0.15
+    movie_count = np.maximum(1, (popularity * 1e5).astype(np.int64))
+    tag_names = np.array(['tag %d' % i for i in range(tags)], dtype=object)
+    tag = tag_names[rng.integers(0, tags, rows)]
+    tag[rng.random(rows) < 0.3] = None
+    df = pd.DataFrame({
+        'userId': rng.integers(1, 200000, rows),
+        'movieId': movie + 1,
+        'title': np.char.add('Movie ', (movie + 1).astype(str)),
+        'rating': rng.integers(1, 11, rows) / 2,
+        'tag': tag,
+        'year': movie_year[movie],
+        'month': rng.integers(1, 13, rows),
+        'day_of_week': np.array(WEEKDAY_ORDER)[rng.integers(0, 7, rows)],
+        'rating_count': movie_count[movie],
+    })
+    for i, genre in enumerate(GENRE_COLS):
+        df[genre] = movie_genres[movie, i].astype(np.int8)
+    return df
+
+
+def write_synthetic_csv(path, rows, chunk_rows=1_000_000, seed=0):
+    """Write ``rows`` synthetic rows to ``path`` in bounded-memory chunks."""
+    written = 0
+    while written < rows:
+        n = min(chunk_rows, rows - written)
+        make_synthetic(n, seed=seed + written).to_csv(path, mode='a' if written else 'w', header=not written, index=False)
+        written += n
+
+
+# === Timing ===
+def time_call(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {'min_ms': min(samples), 'median_ms': statistics.median(samples), 'max_ms': max(samples)}, result
+
+
+# === Cold start ===
+# A fresh interpreter per sample, as on a new pod: time until the sidebar
+# options are read (from the metadata sidecar), until the query and chart
+# modules are imported and until the dataset is loaded.
+COLD_START = '''
+import json, sys, time
+start = time.perf_counter()
+from widgets import sidebar_options
+sidebar_options(sys.argv[1])
+sidebar = time.perf_counter()
+import dashboard_core
+imports = time.perf_counter()
+dashboard_core.open_dataset(sys.argv[1])
+data = time.perf_counter()
+print(json.dumps({'sidebar': sidebar - start, 'imports': imports - start, 'data': data - start}))
+'''
+
+
+def cold_start(path, repeat):
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    # The first run writes the sidecar the others read.
+    for _ in range(repeat + 1):
+        out = subprocess.run([sys.executable, '-c', COLD_START, path], cwd=here, check=True, capture_output=True,
+                             text=True).stdout
+        samples.append(json.loads(out.splitlines()[-1]))
+    return {'startup.' + milestone: {'min_ms': min(s[milestone] for s in samples[1:]) * 1000,
+                                     'median_ms': statistics.median(s[milestone] for s in samples[1:]) * 1000,
+                                     'max_ms': max(s[milestone] for s in samples[1:]) * 1000}
+            for milestone in ('sidebar', 'imports', 'data')}
+
+
+def run(rows, repeat=5, workdir=None, snapshot=True, startup=True):
+    """Benchmark one dataset size; returns a JSON-serializable report."""
+    workdir = workdir or tempfile.mkdtemp(prefix='dashboard-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    path = os.path.join(workdir, 'bench_%d.xls' % rows)
+    results = {}
+    if not os.path.exists(path):
+        write_synthetic_csv(path, rows)
+
+    results['load.csv'], df = time_call(lambda: sort_by_year(read_csv_typed(path)), repeat=1)
+    if snapshot:
+        for fmt in ('parquet', 'arrays'):
+            try:
+                snapshot_file = write_snapshot(path, fmt)
+            except ImportError:
+                continue
+            results['load.' + fmt], _ = time_call(lambda: sort_by_year(read_snapshot(snapshot_file)), repeat=1)
+
+    if startup:
+        results.update(cold_start(path, repeat))
+
+    dataset = Dataset(df, path, None)
+    for name, build in [('filter_index', get_filter_index), ('cube', get_cube), ('genre_year', get_genre_year_table),
+                        ('time_rollup', get_time_rollup), ('filter_options', filter_options),
+                        ('sketches', get_sketches)]:
+        results['build.' + name], _ = time_call(lambda: build(dataset), repeat=1)
+
+    options = filter_options(dataset)
+    year = options['year'][len(options['year']) // 2]
+    tags = options['tag'][:5]
+    index = get_filter_index(dataset)
+    cases = {
+        'year': (year, 'All', None),
+        'genre': ('All', 'Drama', None),
+        'year_genre': (year, 'Drama', None),
+        'one_tag': ('All', 'All', tags[:1]),
+        'five_tags_genre': ('All', 'Drama', tags),
+    }
+    for name, (y, g, t) in cases.items():
+        results['filter.' + name], _ = time_call(lambda: index.filter(df, y, g, t), repeat)
+        results['filter_mask.' + name], _ = time_call(lambda: _mask_filter(df, y, g, t), repeat)
+
+    payload_bytes = {}
+    filters = {'year': year, 'genre': 'Drama', 'tags': tags, 'genre_cols': GENRE_COLS, 'approximate': False,
+               'dates': None}
+    for name, view in VIEWS.items():
+        results['view.' + name], data = time_call(lambda: view.run(dataset, filters), repeat)
+        results['figure.' + name], fig = time_call(lambda: make_figure(name, data, name), repeat)
+        payload_bytes[name] = 0 if fig is None else len(Chart(fig).json)
+        if 'approximate' in view.inputs:
+            approximate = dict(filters, approximate=True)
+            results['view_approx.' + name], _ = time_call(lambda: view.run(dataset, approximate), repeat)
+
+    return {
+        'rows': rows,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'results': results,
+        'payload_bytes': payload_bytes,
+    }
+
+
+def _mask_filter(df, year, genre, tags):
+    # The original per-rerun boolean-mask filter, kept as a baseline.
+    if year != 'All':
+        df = df[df['year'] == year]
+    if genre != 'All':
+        df = df[(df[GENRE_MASK] & (1 << GENRE_BIT[genre])) != 0]
+    if tags:
+        df = df[df['tag'].isin(tags)]
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time dashboard load, filter, view and figure stages on synthetic data and report chart payload sizes.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="dataset sizes to benchmark (e.g. 10000 1000000 50000000)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workdir', help="directory for the generated CSV/snapshot files (reused if present)")
+    parser.add_argument('--no-snapshot', action='store_true', help="skip the Parquet / mapped-array snapshot loads")
+    parser.add_argument('--no-startup', action='store_true', help="skip the fresh-process cold start timings")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    parser.add_argument('--write-csv', metavar='PATH',
+                        help="only write a synthetic export of the first --rows size to PATH (e.g. dashboard_df.xls)")
+    args = parser.parse_args()
+    if args.write_csv:
+        write_synthetic_csv(args.write_csv, args.rows[0])
+        return
+
+    report = [run(rows, args.repeat, args.workdir, not args.no_snapshot, not args.no_startup) for rows in args.rows]
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
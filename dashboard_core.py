@@ -0,0 +1,168 @@
+import os
+
+import streamlit as st
+
+from aggregates import get_time_rollup
+from data_loader import load_dataset
+from figure_cache import FIGURES, cached_figure
+from rendering import Chart, bytes_sent, compact, downsample, record_sent
+from metrics import filter_labels, prometheus_text, span
+from snapshot import GENRE_COLS, VIEW_COLUMNS, columns_for
+from views import get_metadata
+from widgets import ROLLUP_VIEWS, cold_start
+
+# === Dashboard core ===
+# Everything the dashboard layouts share: the dataset store, the query API,
+# chart construction and styling. The layout scripts only arrange widgets
+# and pick titles/themes. Only show_view needs a running Streamlit session,
+# so the query and figure paths can be timed on their own (see
+# benchmark.py). The sidebar widgets live in widgets.py, which layouts use
+# before importing this module: pandas and plotly are most of a cold start.
+# The queries themselves are in aggregates.py and the views in views.py.
+
+
+# === Data store ===
+def open_dataset(path, views=VIEW_COLUMNS, genre_cols=GENRE_COLS, chunksize=None, approximate=False):
+    """Shared dataset for ``path`` holding only the columns ``views`` read.
+
+    The time rollup (for ROLLUP_VIEWS) and the metadata sidecar are built as
+    soon as the data is loaded, so neither the first monthly/weekly chart
+    nor the next cold start pays for them.
+    """
+    with span('load', source=os.path.basename(path)) as stage:
+        dataset = load_dataset(path, columns=columns_for(views, genre_cols), chunksize=chunksize,
+                               approximate=approximate)
+        if ROLLUP_VIEWS.intersection(views):
+            get_time_rollup(dataset)
+        get_metadata(dataset)
+        stage.rows = len(dataset.df)
+    cold_start('data')
+    return dataset
+
+
+# === Styling ===
+GOLD = '#FFD700'
+
+THEMES = {
+    'plain': dict(
+        plot_bgcolor='black',
+        paper_bgcolor='black',
+        font_color='yellow',
+        title_font_size=22,
+        title_x=0.5,
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=False),
+    ),
+    'bold': dict(
+        title_font_size=26,
+        title_font_color='yellow',
+        title_x=0.5,
+        plot_bgcolor='black',
+        paper_bgcolor='black',
+        font=dict(color='yellow', size=14),
+        xaxis=dict(showgrid=False, zeroline=False, title_font=dict(size=18, color='yellow', family='Arial, sans-serif')),
+        yaxis=dict(showgrid=False, zeroline=False, title_font=dict(size=18, color='yellow', family='Arial, sans-serif')),
+        margin=dict(l=40, r=40, t=60, b=40),
+        hoverlabel=dict(bgcolor="black", font_size=14, font_color="yellow"),
+    ),
+    'gold': dict(
+        title=dict(font=dict(color=GOLD, size=22), x=0.5),
+        plot_bgcolor='black',
+        paper_bgcolor='black',
+        font=dict(color=GOLD),
+        xaxis=dict(showgrid=False, tickfont=dict(color=GOLD, size=14), title_font=dict(color=GOLD, size=16),
+                   title_standoff=15),
+        yaxis=dict(showgrid=False, tickfont=dict(color=GOLD, size=14), title_font=dict(color=GOLD, size=16),
+                   title_standoff=15),
+        legend=dict(font=dict(color=GOLD, size=14)),
+    ),
+}
+
+
+def style_figure(fig, title, theme='gold'):
+    fig.update_layout(**THEMES[theme])
+    fig.update_layout(title_text=title)
+    return fig
+
+
+# === Charts ===
+# view name -> (plotly express function, x, y, extra arguments)
+CHARTS = {
+    'Top Movies': ('bar', 'rating_count', 'title', {'orientation': 'h'}),
+    'Trending Now': ('bar', 'rating_count', 'title', {'orientation': 'h'}),
+    'Average Rating Over Years': ('line', 'year', 'rating', {'markers': True}),
+    'Genre Popularity': ('bar', 'Rating Count', 'Genre', {'orientation': 'h'}),
+    'Movies by Tags': ('bar', 'rating_count', 'title', {'orientation': 'h'}),
+    'Monthly Trends': ('line', 'month', 'rating_count', {'markers': True}),
+    'Weekly Trends': ('bar', 'day_of_week', 'rating_count', {}),
+}
+
+
+def make_figure(view_name, data, title, theme='gold', labels=None):
+    """Styled chart for ``view_name``'s query result, or None when it is empty."""
+    if data.empty:
+        return None
+    if 'error_bound' in data.attrs:
+        title += " (approx. +%d at %d%% confidence)" % (data.attrs['error_bound'], data.attrs['confidence'] * 100)
+    # Imported on the first chart rather than at startup.
+    import plotly.express as px
+    kind, x, y, kwargs = CHARTS[view_name]
+    if kind == 'line':
+        data = downsample(data, x, y)
+    with span('figure', view=view_name) as stage:
+        fig = getattr(px, kind)(data, x=x, y=y, labels=labels, color_discrete_sequence=[GOLD], **kwargs)
+        stage.rows = len(data)
+    with span('style', view=view_name):
+        return compact(style_figure(fig, title, theme))
+
+
+def chart_for(layout, dataset, view, filters, title, theme='gold', labels=None):
+    """Cached :class:`rendering.Chart` for ``view`` under ``filters`` as drawn by ``layout``, or None.
+
+    ``chart.json`` is the figure already serialized, for callers that send
+    the payload themselves.
+    """
+    def build(data):
+        fig = make_figure(view.name, data, title, theme, labels)
+        return None if fig is None else Chart(fig)
+    return cached_figure(layout, dataset, view, filters, build)
+
+
+def figure_for(layout, dataset, view, filters, title, theme='gold', labels=None):
+    """Cached figure for ``view`` under ``filters`` as drawn by ``layout``."""
+    chart = chart_for(layout, dataset, view, filters, title, theme, labels)
+    return None if chart is None else chart.figure
+
+
+def show_view(layout, dataset, view, filters, title, theme='gold', empty_message="No data found for selected filters.",
+              labels=None):
+    with span('view', layout=layout, view=view.name, **filter_labels(filters)):
+        chart = chart_for(layout, dataset, view, filters, title, theme, labels)
+        if chart is None:
+            st.warning(empty_message)
+            return
+        with span('send', layout=layout, view=view.name):
+            st.plotly_chart(chart.figure, use_container_width=True)
+        record_sent(layout, view.name, chart)
+    cold_start('chart')
+
+
+# === Diagnostics ===
+def metrics_text():
+    """Stage timings, figure cache and bytes-sent counters in the Prometheus text format."""
+    cache = FIGURES.stats()
+    sent = bytes_sent()
+    return prometheus_text([
+        ('dashboard_figure_cache_requests_total', 'counter', "Figure cache lookups.",
+         [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])]),
+        ('dashboard_figure_cache_bytes', 'gauge', "Serialized size of the cached figures.", [({}, cache['bytes'])]),
+        ('dashboard_chart_payload_bytes_total', 'counter',
+         "Estimated chart payload sent to browsers: the size of each figure's JSON.",
+         [({'layout': layout, 'view': view}, s['bytes']) for (layout, view), s in sent.items()]),
+        ('dashboard_charts_sent_total', 'counter', "Charts sent to browsers.",
+         [({'layout': layout, 'view': view}, s['charts']) for (layout, view), s in sent.items()]),
+    ])
+
+
+# The query and chart modules above are loaded (see widgets.cold_start).
+cold_start('imports')
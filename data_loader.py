@@ -0,0 +1,299 @@
+import itertools
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from metadata import file_signature, resolve_source
+from metrics import span
+from snapshot import (SNAPSHOT_FORMATS, csv_extent, csv_line_start, csv_tail, find_snapshot, read_csv_typed,
+                      read_snapshot, snapshot_covers)
+
+logger = logging.getLogger(__name__)
+
+# === Process-wide dataset cache ===
+# Streamlit re-executes the dashboard script on every widget change, but
+# imported modules stay loaded for the life of the server process, so a
+# module-level cache is shared by every rerun and every session.
+_datasets = {}
+_lock = threading.Lock()
+_versions = itertools.count(1)
+
+
+class Dataset:
+    """One loaded version of a dashboard source file.
+
+    ``df`` is shared by all sessions and must be treated as read-only;
+    filter with boolean masks / ``.loc`` (which return new frames) rather
+    than assigning into it. Aggregates and indexes derived from ``df`` are
+    built once on first use via :meth:`derived` and shared the same way.
+
+    ``path`` is what the dashboard opened: a file, or a directory of drops
+    whose newest file is ``source``.
+
+    ``offset``/``tail`` locate the end of the CSV lines ``df`` was parsed
+    from, so rows appended to the export later can be ingested on their own.
+
+    A ``streamed`` dataset (see streaming.py) keeps no rows at all: ``df`` is
+    an empty frame with the source's columns and only mergeable aggregates
+    are available.
+    """
+
+    def __init__(self, df, path, signature, columns=None, streamed=False, source=None):
+        self.df = df
+        self.path = path
+        self.source = source or path
+        self.signature = signature
+        self.columns = columns
+        self.streamed = streamed
+        self.offset = df.attrs.get('source_offset')
+        self.tail = df.attrs.get('source_tail')
+        self.version = next(_versions)
+        self._derived = {}
+        self._builders = {}
+        self._derived_lock = threading.RLock()
+
+    def derived(self, name, build, merge=None):
+        """Build ``name`` from this dataset once and share it.
+
+        ``merge(old, new)`` combines the value for this dataset with the value
+        built from appended rows alone; derived values without one are simply
+        rebuilt on the next version.
+        """
+        with self._derived_lock:
+            if name not in self._derived:
+                self._derived[name] = build(self)
+                self._builders[name] = (build, merge)
+            return self._derived[name]
+
+    def absorb(self, other):
+        """Fold ``other``'s mergeable derived values into this dataset's."""
+        with self._derived_lock:
+            for name, (build, merge) in other._builders.items():
+                if merge is None:
+                    continue
+                if name in self._derived:
+                    self._derived[name] = merge(self._derived[name], other._derived[name])
+                else:
+                    self._derived[name] = other._derived[name]
+                    self._builders[name] = (build, merge)
+
+    def prepare(self, like):
+        """Build every derived value ``like`` has, so the first rerun on this version does not."""
+        with like._derived_lock:
+            builders = dict(like._builders)
+        for name, (build, merge) in builders.items():
+            self.derived(name, build, merge)
+
+    def appended(self, delta, signature):
+        """Next version of this dataset with ``delta`` rows added."""
+        delta = sort_by_year(delta)
+        df = delta.iloc[:0] if self.streamed else _merge_by_year(self.df, delta)
+        dataset = Dataset(df, self.path, signature, self.columns, self.streamed, self.source)
+        delta_dataset = Dataset(delta, self.path, signature, self.columns, source=self.source)
+        with self._derived_lock:
+            for name, (build, merge) in self._builders.items():
+                if merge is not None:
+                    delta_dataset.derived(name, build, merge)
+            dataset.absorb(self)
+        dataset.absorb(delta_dataset)
+        return dataset
+
+
+def _read_source(path, columns=None):
+    # A typed columnar snapshot (see snapshot.py) is preferred whenever one
+    # exists and still describes a prefix of the CSV export it was built
+    # from; lines appended since are picked up by _catch_up.
+    if os.path.splitext(path)[1] in SNAPSHOT_FORMATS:
+        return read_snapshot(path, columns)
+    snapshot = find_snapshot(path)
+    if snapshot is not None:
+        df = read_snapshot(snapshot, columns)
+        if snapshot_covers(df, path, snapshot):
+            return df
+    return read_csv_typed(path, columns)
+
+
+def sort_by_year(df):
+    # Rows are kept in year order (missing years last) so that every year is
+    # a contiguous row range for the filter index. Frames that already are
+    # (snapshots are written sorted) are returned as they are, which keeps a
+    # memory-mapped snapshot mapped rather than copied.
+    if 'year' not in df.columns:
+        return df
+    years = df['year'].to_numpy(dtype='float64', na_value=np.inf)
+    if np.all(years[1:] >= years[:-1]):
+        return df
+    return df.sort_values('year', kind='stable', na_position='last', ignore_index=True)
+
+
+def _merge_by_year(df, delta):
+    # Both frames are year-sorted, so the combined frame interleaves slices of
+    # them: each year block of ``delta`` goes after the rows of ``df`` with
+    # the same or an earlier year. Building it is one copy (in a single
+    # concat) and no sort; rows appended for the latest years just go last.
+    # Categorical columns are aligned on the union of both vocabularies so
+    # the combined frame stays dictionary-encoded.
+    old_columns, new_columns = {}, {}
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and col in delta.columns:
+            categories = df[col].cat.categories.union(delta[col].cat.categories, sort=False)
+            old_columns[col] = df[col].cat.set_categories(categories)
+            new_columns[col] = delta[col].cat.set_categories(categories)
+    df, delta = df.assign(**old_columns), delta.assign(**new_columns)
+    pieces = [df, delta]
+    if 'year' in df.columns and len(df) and len(delta):
+        years = df['year'].to_numpy(dtype='float64', na_value=np.inf)
+        delta_years = delta['year'].to_numpy(dtype='float64', na_value=np.inf)
+        _, starts = np.unique(delta_years, return_index=True)
+        stops = np.append(starts[1:], len(delta))
+        inserts = np.searchsorted(years, delta_years[starts], side='right')
+        pieces, prev = [], 0
+        for insert, start, stop in zip(inserts, starts, stops):
+            pieces += [df.iloc[prev:insert], delta.iloc[start:stop]]
+            prev = insert
+        pieces.append(df.iloc[prev:])
+    combined = pd.concat(pieces, ignore_index=True)
+    combined.attrs = dict(delta.attrs)
+    return combined
+
+
+def _catch_up(dataset, signature):
+    """Ingest lines appended to ``dataset``'s CSV source, or return None if it was rewritten."""
+    if os.path.splitext(dataset.source)[1] in SNAPSHOT_FORMATS or dataset.offset is None:
+        return None
+    if csv_tail(dataset.source, dataset.offset) != dataset.tail:
+        return None
+    # A last line parsed without its newline that has since been extended
+    # was read unfinished.
+    if not csv_line_start(dataset.source, dataset.offset):
+        return None
+    extent = csv_extent(dataset.source)
+    if extent <= dataset.offset:
+        dataset.signature = signature
+        return dataset
+    delta = read_csv_typed(dataset.source, dataset.columns, start=dataset.offset, end=extent)
+    return dataset.appended(delta, signature)
+
+
+def _next_version(key, dataset, source, signature):
+    """Dataset for ``source`` under cache ``key``, built on ``dataset`` (the current version, or None)."""
+    path, columns, chunksize, sketches = key
+    refreshed = None
+    if dataset is not None and dataset.source == source:
+        refreshed = _catch_up(dataset, signature)
+    if refreshed is None and chunksize:
+        # Imported here because streaming builds on this module.
+        from streaming import stream_dataset
+        refreshed = stream_dataset(path, signature, columns, chunksize, source=source, sketches=sketches)
+    elif refreshed is None:
+        refreshed = Dataset(sort_by_year(_read_source(source, columns)), path, signature, columns, source=source)
+        refreshed = _catch_up(refreshed, signature) or refreshed
+    return refreshed
+
+
+def load_dataset(path, columns=None, chunksize=None, approximate=False):
+    """Shared dataset for ``path`` (a data file or a directory of drops).
+
+    With ``chunksize`` the CSV source is aggregated ``chunksize`` rows at a
+    time into a streamed dataset instead of being held in memory; it carries
+    heavy-hitter sketches only with ``approximate``. Only the
+    first call for a source loads it; later versions are built by the
+    background refresher (see REFRESH_INTERVAL).
+    """
+    path = os.path.abspath(path)
+    if columns is not None:
+        columns = tuple(columns)
+    key = (path, columns, chunksize, bool(chunksize and approximate))
+    with _lock:
+        dataset = _datasets.get(key)
+        if dataset is not None and REFRESH_INTERVAL:
+            return dataset
+        source = resolve_source(path)
+        signature = file_signature(source)
+        if dataset is None or (dataset.source, dataset.signature) != (source, signature):
+            dataset = _datasets[key] = _next_version(key, dataset, source, signature)
+        if REFRESH_INTERVAL:
+            _start_refresher()
+        return dataset
+
+
+# === Background refresh ===
+# Once a source is loaded, a daemon thread checks it every REFRESH_INTERVAL
+# seconds. A change is picked up once the source has stayed the same for a
+# whole interval, so a file still being written is not read half way. The
+# next version, with every index and aggregate the current one has, is
+# built on that thread and then swapped into the cache in one assignment:
+# reruns already holding the previous Dataset finish on it, and caches keyed
+# on Dataset.version (figure_cache.py) drop the old entries once the new
+# version is seen. If a build fails the current version stays and the next
+# change is tried again. Set REFRESH_INTERVAL to None to check the source on
+# every load_dataset call instead (and build new versions inside it); a
+# running refresher then stops after its current check.
+REFRESH_INTERVAL = 2.0
+
+_refresher = None
+_seen = {}
+
+
+def _start_refresher():
+    global _refresher
+    if _refresher is None:
+        _refresher = threading.Thread(target=_refresh_loop, name='dataset-refresher', daemon=True)
+        _refresher.start()
+
+
+def _refresh_loop():
+    global _refresher
+    while True:
+        interval = REFRESH_INTERVAL
+        if not interval:
+            break
+        time.sleep(interval)
+        try:
+            refresh_datasets()
+        except Exception:
+            logger.exception("refreshing datasets failed")
+    with _lock:
+        _refresher = None
+
+
+def refresh_datasets():
+    """Build and swap in the next version of every loaded dataset whose source changed and has settled."""
+    with _lock:
+        current = list(_datasets.items())
+    for key, dataset in current:
+        try:
+            source = resolve_source(key[0])
+            state = (source, file_signature(source))
+        except OSError:
+            continue
+        except Exception:
+            logger.exception("checking %s for changes failed", key[0])
+            continue
+        if state == (dataset.source, dataset.signature):
+            _seen.pop(key, None)
+            continue
+        if _seen.get(key) != state:
+            _seen[key] = state
+            continue
+        del _seen[key]
+        try:
+            with span('refresh', source=os.path.basename(key[0])) as stage:
+                refreshed = _next_version(key, dataset, *state)
+                if refreshed is not dataset:
+                    refreshed.prepare(dataset)
+                stage.rows = len(refreshed.df)
+        except Exception:
+            logger.exception("refreshing %s failed; keeping version %d", key[0], dataset.version)
+            continue
+        with _lock:
+            if _datasets.get(key) is dataset:
+                _datasets[key] = refreshed
+
+
+def load_dashboard_df(path, columns=None):
+    return load_dataset(path, columns).df
@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+
+
+# === Figure cache ===
+# Finished Plotly figures (or anything else with a ``to_json``, such as
+# rendering.Chart) shared by every session in the process, keyed by layout,
+# dataset version, view and the normalized filters the view reads. Figures
+# handed out are shared and must not be modified; st.plotly_chart only
+# serializes a copy. Entries are evicted least-recently-used once either
+# the entry count or the total serialized size goes over its limit, and
+# entries for older versions of a dataset are dropped as soon as a newer
+# version is seen.
+class FigureCache:
+    def __init__(self, max_entries=512, max_bytes=128 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _invalidate_older(self, path, version):
+        if self._latest.get(path, 0) >= version:
+            return
+        self._latest[path] = version
+        for key in [k for k in self._entries if k[1] == path and k[2] < version]:
+            self._drop(key)
+
+    def get_or_build(self, key, build):
+        """Return the cached figure for ``key`` (layout, path, version, ...), building it on a miss."""
+        with self._lock:
+            self._invalidate_older(key[1], key[2])
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        fig = build()
+        size = 0 if fig is None else len(fig.to_json())
+        with self._lock:
+            if key[2] < self._latest.get(key[1], 0) or size > self.max_bytes:
+                return fig
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (fig, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+        return fig
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'bytes': self._bytes}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+FIGURES = FigureCache()
+
+
+def _normalize(value):
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(value))
+    return value
+
+
+def cached_figure(layout, dataset, view, filters, make_figure):
+    """Figure for ``view`` under ``filters``; ``make_figure(data)`` runs only on a cache miss.
+
+    ``make_figure`` may return None (e.g. for an empty result), which is cached too.
+    """
+    state = tuple((key, _normalize(filters[key])) for key in view.inputs)
+    key = (layout, dataset.path, dataset.version, view.name, state)
+    return FIGURES.get_or_build(key, lambda: make_figure(view.run(dataset, filters)))
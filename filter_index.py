@@ -0,0 +1,77 @@
+import numpy as np
+
+from metadata import ALL
+from snapshot import GENRE_BIT, GENRE_MASK, genre_columns
+
+
+def year_ranges(df):
+    """year -> [start, stop) row range of a year-sorted frame."""
+    ranges = {}
+    if 'year' in df.columns:
+        years = df['year'].to_numpy(dtype='float64', na_value=np.nan)
+        known = years[~np.isnan(years)]
+        values, starts, counts = np.unique(known, return_index=True, return_counts=True)
+        for value, start, count in zip(values, starts, counts):
+            ranges[int(value)] = (int(start), int(start + count))
+    return ranges
+
+
+# === Filter index ===
+# Built once per dataset on the year-sorted frame (see data_loader):
+#   * year  -> contiguous [start, stop) row range
+#   * genre -> the frame's own GENRE_MASK column (one bit per genre)
+#   * tag   -> sorted row ids (inverted index in CSR form)
+# Any year/genre/tags combination resolves to row positions without a
+# full-length boolean mask over the frame.
+class FilterIndex:
+    def __init__(self, df):
+        self.n = len(df)
+        self.year_ranges = year_ranges(df)
+
+        self._genres = set(genre_columns(df))
+        self._genre_mask_col = df[GENRE_MASK].to_numpy() if self._genres else None
+
+        self._tag_codes = {}
+        if 'tag' in df.columns:
+            tags = df['tag'].astype('category').cat
+            codes = tags.codes.to_numpy()
+            self._tag_codes = {tag: code for code, tag in enumerate(tags.categories)}
+            self._tag_rows = np.argsort(codes, kind='stable')
+            self._tag_offsets = np.searchsorted(codes[self._tag_rows], np.arange(len(tags.categories) + 1))
+
+    def year_range(self, year):
+        if year == ALL:
+            return 0, self.n
+        return self.year_ranges.get(int(year), (0, 0))
+
+    def tag_rows(self, tags):
+        parts = [self._tag_rows[self._tag_offsets[c]:self._tag_offsets[c + 1]]
+                 for c in (self._tag_codes.get(t) for t in tags) if c is not None]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        # Each row carries a single tag, so the per-tag lists are disjoint.
+        return np.sort(np.concatenate(parts))
+
+    def _genre_mask(self, genre, rows):
+        return (self._genre_mask_col[rows] & np.uint32(1 << GENRE_BIT[genre])) != 0
+
+    def rows(self, year=ALL, genre=ALL, tags=None):
+        """Row positions matching the filters, or a slice when only the year is set."""
+        start, stop = self.year_range(year)
+        genre = genre if genre in self._genres else ALL
+        if tags:
+            rows = self.tag_rows(tags)
+            rows = rows[np.searchsorted(rows, start):np.searchsorted(rows, stop)]
+            if genre != ALL:
+                rows = rows[self._genre_mask(genre, rows)]
+            return rows
+        if genre == ALL:
+            return slice(start, stop)
+        return start + np.flatnonzero(self._genre_mask(genre, slice(start, stop)))
+
+    def filter(self, df, year=ALL, genre=ALL, tags=None):
+        return df.iloc[self.rows(year, genre, tags)]
+
+
+def get_filter_index(dataset):
+    return dataset.derived('filter_index', lambda ds: FilterIndex(ds.df))
@@ -0,0 +1,76 @@
+import json
+import os
+
+# Nothing in this module imports numpy, pandas or plotly: the layouts draw
+# their sidebar from the metadata sidecar before those are loaded (see
+# widgets.py).
+
+# Filter value that selects every year / genre.
+ALL = 'All'
+
+
+# === Sources ===
+# CSV exports and the snapshot formats of snapshot.SNAPSHOT_FORMATS; anything
+# else in a drop directory (hidden files, ``.tmp`` files still being
+# written) is ignored.
+DROP_FORMATS = ('.csv', '.xls', '.parquet', '.feather', '.arrays')
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def resolve_source(path):
+    """``path`` itself, or for a directory of drops the newest data file in it."""
+    if not os.path.isdir(path) or os.path.splitext(path)[1] in DROP_FORMATS:
+        return path
+    drops = [entry.path for entry in os.scandir(path)
+             if not entry.name.startswith('.') and os.path.splitext(entry.name)[1] in DROP_FORMATS]
+    if not drops:
+        raise FileNotFoundError("no data files in %s" % path)
+    return max(drops, key=lambda p: (os.stat(p).st_mtime_ns, p))
+
+
+# === Metadata sidecar ===
+# What the sidebar needs -- years, genres, the tag vocabulary with rating
+# counts and the months that have ratings -- written next to the source
+# (``<name>.meta.json``) whenever a dataset version is ingested, together
+# with the source file and signature it describes. A sidecar for an older
+# version of the source is ignored.
+def metadata_path(path):
+    return os.path.splitext(path.rstrip(os.sep))[0] + '.meta.json'
+
+
+def _read(path):
+    try:
+        with open(metadata_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_metadata(path, source, signature, metadata):
+    """Write the sidecar for ``path``, keeping keys an earlier write for the same source version had."""
+    existing = _read(path)
+    if existing is not None and (existing['source'], existing['signature']) == (source, list(signature)):
+        metadata = dict(existing, **metadata)
+    metadata = dict(metadata, source=source, signature=list(signature))
+    target = metadata_path(path)
+    tmp = target + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(metadata, f)
+    os.replace(tmp, target)
+
+
+def read_metadata(path, keys=()):
+    """The sidecar for ``path`` if it describes the current source and has ``keys``, else None."""
+    metadata = _read(path)
+    if metadata is None or any(key not in metadata for key in keys):
+        return None
+    try:
+        source = resolve_source(path)
+        current = [source, list(file_signature(source))]
+    except OSError:
+        return None
+    return metadata if [metadata['source'], metadata['signature']] == current else None
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# === Stage timings ===
+# Every instrumented stage of a rerun (load, query, figure, serialize,
+# send, ...) records its duration and the rows it produced under its labels
+# (layout, view, and the filter state). The last WINDOW samples per label
+# set are kept for percentiles, plus running counts and sums for the whole
+# process lifetime. Kept free of numpy so the sidebar path can record
+# cold-start timings before it is imported (see widgets.py).
+WINDOW = 1000
+QUANTILES = (0.5, 0.9, 0.99)
+
+_series = {}
+_lock = threading.Lock()
+
+
+class _Series:
+    def __init__(self):
+        self.seconds = deque(maxlen=WINDOW)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.rows = 0
+
+
+class Span:
+    def __init__(self):
+        self.rows = None
+
+
+def filter_labels(filters):
+    """Low-cardinality labels for a filters dict: year, genre, number of tags, approximate."""
+    return {
+        'year': str(filters.get('year', '')),
+        'genre': str(filters.get('genre', '')),
+        'tags': str(len(filters.get('tags') or ())),
+        'approximate': str(bool(filters.get('approximate'))),
+    }
+
+
+@contextmanager
+def span(stage, **labels):
+    """Time the enclosed block as ``stage``; set ``.rows`` on the yielded span to record a row count."""
+    current = Span()
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        record(stage, time.perf_counter() - start, current.rows, **labels)
+
+
+def record(stage, seconds, rows=None, **labels):
+    key = (stage,) + tuple(sorted(labels.items()))
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = _Series()
+        series.seconds.append(seconds)
+        series.count += 1
+        series.total_seconds += seconds
+        if rows is not None:
+            series.rows += rows
+
+
+def _quantile(ordered, q):
+    # Linear interpolation between the closest ranks, as numpy.quantile.
+    position = q * (len(ordered) - 1)
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def snapshot():
+    """Per stage and label set: count, total seconds, rows and rolling percentiles of the last WINDOW samples."""
+    with _lock:
+        items = [(key, sorted(s.seconds), s.count, s.total_seconds, s.rows) for key, s in _series.items()]
+    report = []
+    for key, window, count, total, rows in items:
+        entry = {'stage': key[0], 'labels': dict(key[1:]), 'count': count, 'seconds': total, 'rows': rows}
+        entry.update({'p%g' % (q * 100): _quantile(window, q) for q in QUANTILES})
+        report.append(entry)
+    return report
+
+
+def reset():
+    with _lock:
+        _series.clear()
+
+
+# === Prometheus export ===
+def _label_text(labels):
+    pairs = ['%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in sorted(labels.items())]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def prometheus_text(extra=()):
+    """All stage timings in the Prometheus text exposition format.
+
+    ``extra`` is an iterable of (name, type, help, [(labels, value), ...])
+    for gauges/counters kept elsewhere (figure cache, bytes sent).
+    """
+    lines = [
+        '# HELP dashboard_stage_seconds Time spent per dashboard stage (quantiles over the last %d samples).' % WINDOW,
+        '# TYPE dashboard_stage_seconds summary',
+    ]
+    rows = ['# HELP dashboard_stage_rows_total Rows produced per dashboard stage.',
+            '# TYPE dashboard_stage_rows_total counter']
+    for entry in snapshot():
+        labels = dict(entry['labels'], stage=entry['stage'])
+        for q in QUANTILES:
+            lines.append('dashboard_stage_seconds%s %.6f' % (_label_text(dict(labels, quantile=str(q))),
+                                                            entry['p%g' % (q * 100)]))
+        lines.append('dashboard_stage_seconds_sum%s %.6f' % (_label_text(labels), entry['seconds']))
+        lines.append('dashboard_stage_seconds_count%s %d' % (_label_text(labels), entry['count']))
+        rows.append('dashboard_stage_rows_total%s %d' % (_label_text(labels), entry['rows']))
+    lines += rows
+    for name, kind, help_text, samples in extra:
+        lines += ['# HELP %s %s' % (name, help_text), '# TYPE %s %s' % (name, kind)]
+        lines += ['%s%s %s' % (name, _label_text(labels), value) for labels, value in samples]
+    return '\n'.join(lines) + '\n'
+
+
+def serve(port, text=prometheus_text, host='127.0.0.1'):
+    """Serve ``text()`` on http://host:port/metrics from a daemon thread; returns the server.
+
+    Pass ``dashboard_core.metrics_text`` to include the figure cache and
+    chart payload counters. The labels carry the selected filters, so only
+    the local host can scrape it unless another ``host`` is given.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,152 @@
+import atexit
+import functools
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from snapshot import column_buffers, column_from_buffers
+
+# === Parallel aggregation ===
+# Additive aggregates (see Dataset.derived) can be built over any split of
+# the rows and merged afterwards. For large frames the rows are split into
+# one contiguous range per worker and each worker process builds the
+# aggregate for its range from the frame's shared memory copy; the partial
+# results are merged in the caller with the aggregate's own merge function.
+#
+# Set MAX_WORKERS to 1 to keep every build in the calling thread.
+MAX_WORKERS = os.cpu_count() or 1
+PARALLEL_MIN_ROWS = 1_000_000
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Streamlit serves sessions from threads, so workers are spawned
+            # rather than forked from a multi-threaded process.
+            _pool = ProcessPoolExecutor(MAX_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(_pool.shutdown, cancel_futures=True)
+        return _pool
+
+
+# === Shared columns ===
+# Columns travel as the numpy buffers of snapshot.column_buffers, one shared
+# memory block each. A frame is copied into shared memory once, on its first
+# parallel build, and every later build of it (cube, genre x year table,
+# time rollup, sketches) reuses that copy; the blocks are unlinked when the
+# frame (the dataset version) is garbage collected. Workers keep the blocks
+# they attached and build on read-only views of them, not copies.
+class SharedFrame:
+    """Columns of ``df`` copied into shared memory blocks that worker processes attach by name."""
+
+    def __init__(self, df):
+        self.attrs = dict(df.attrs)
+        self.columns = {}
+        self._blocks = []
+        for col in df.columns:
+            specs = {}
+            for part, array in column_buffers(df[col]).items():
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+                self._blocks.append(block)
+                specs[part] = (block.name, array.shape, array.dtype.str)
+            self.columns[col] = (df[col].dtype, specs)
+
+    def spec(self):
+        return self.attrs, self.columns
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+_frames = {}
+_frames_lock = threading.RLock()
+
+
+def _release(key):
+    with _frames_lock:
+        shared = _frames.pop(key, None)
+    if shared is not None:
+        shared.close()
+
+
+def shared_frame(df):
+    """The :class:`SharedFrame` of ``df``, created on first use and kept while ``df`` is alive."""
+    with _frames_lock:
+        shared = _frames.get(id(df))
+        if shared is None:
+            shared = _frames[id(df)] = SharedFrame(df)
+            weakref.finalize(df, _release, id(df))
+        return shared
+
+
+# Blocks attached in this (worker) process by name.
+_attached = {}
+
+
+def _attach(names):
+    for name in list(_attached):
+        if name not in names:
+            # A frame no longer being built from; its views are gone once its builds returned.
+            try:
+                _attached.pop(name).close()
+            except BufferError:
+                pass
+    for name in names:
+        if name not in _attached:
+            _attached[name] = shared_memory.SharedMemory(name=name)
+    return _attached
+
+
+def _read_partition(spec, start, stop, columns):
+    attrs, shared_columns = spec
+    blocks = _attach({name for _, specs in shared_columns.values() for name, _, _ in specs.values()})
+    data = {}
+    for col in columns:
+        dtype, specs = shared_columns[col]
+        arrays = {}
+        for part, (name, shape, array_dtype) in specs.items():
+            array = np.ndarray(shape, array_dtype, buffer=blocks[name].buf)[start:stop]
+            array.flags.writeable = False
+            arrays[part] = array
+        data[col] = column_from_buffers(dtype, arrays)
+    df = pd.DataFrame(data, copy=False)
+    df.attrs = attrs
+    return df
+
+
+def _build_partition(build, spec, start, stop, columns):
+    return build(_read_partition(spec, start, stop, columns))
+
+
+def _boundaries(n, parts):
+    return np.linspace(0, n, parts + 1).astype(int)
+
+
+def map_partitions(df, build, merge, columns):
+    """``build(df[columns])`` computed over row ranges in worker processes and combined with ``merge``.
+
+    ``build`` must be a module-level function (it is pickled by reference)
+    whose results for disjoint row ranges combine with ``merge``. Small
+    frames are built directly.
+    """
+    if MAX_WORKERS <= 1 or len(df) < PARALLEL_MIN_ROWS:
+        return build(df)
+    spec = shared_frame(df).spec()
+    columns = [c for c in columns if c in df.columns]
+    bounds = _boundaries(len(df), MAX_WORKERS)
+    futures = [_executor().submit(_build_partition, build, spec, start, stop, columns)
+               for start, stop in zip(bounds[:-1], bounds[1:])]
+    return functools.reduce(merge, [future.result() for future in futures])
@@ -0,0 +1,89 @@
+import threading
+
+import numpy as np
+import plotly.io as pio
+
+from metrics import span
+
+# === Payload reduction ===
+# What reaches the browser is the figure JSON, so figures are trimmed before
+# they are cached: line charts keep at most MAX_POINTS points (largest-
+# triangle-three-buckets downsampling keeps the visible shape), and the
+# plotly express template and per-trace bookkeeping fields are dropped. The
+# template is most of a small chart's JSON and Streamlit applies its own
+# theme over it in the browser anyway.
+MAX_POINTS = 500
+
+# Trace fields plotly express fills in for legends/grouping that a single
+# trace chart never uses.
+UNUSED_TRACE_FIELDS = ('legendgroup', 'offsetgroup', 'alignmentgroup', 'textposition', 'name')
+
+
+def lttb(x, y, n_out):
+    """Indices of the ``n_out`` points of (x, y) chosen by largest-triangle-three-buckets."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bucket = (n - 2) / (n_out - 2)
+    chosen = [0]
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = int(i * bucket) + 1, int((i + 1) * bucket) + 1
+        next_stop = min(int((i + 2) * bucket) + 1, n)
+        avg_x, avg_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        chosen.append(a)
+    chosen.append(n - 1)
+    return np.array(chosen)
+
+
+def downsample(data, x, y, max_points=MAX_POINTS):
+    if len(data) <= max_points:
+        return data
+    return data.iloc[lttb(data[x].to_numpy(), data[y].to_numpy(dtype=np.float64, na_value=np.nan), max_points)]
+
+
+def compact(fig):
+    fig.layout.template = None
+    for trace in fig.data:
+        for field in UNUSED_TRACE_FIELDS:
+            trace[field] = None
+    return fig
+
+
+class Chart:
+    """A finished figure together with its JSON payload, serialized once."""
+
+    def __init__(self, figure):
+        self.figure = figure
+        with span('serialize'):
+            self.json = pio.to_json(figure, validate=False)
+
+    def to_json(self):
+        return self.json
+
+
+# === Bytes sent ===
+# Per (layout, view): number of charts sent and their total JSON size. This
+# is an estimate of the payload: st.plotly_chart is passed the figure and
+# serializes it again itself. It makes the same plotly.io.to_json call as
+# Chart, so the two agree (tests/test_rendering.py checks this), but a
+# Streamlit release that serializes differently would make them drift.
+_sent = {}
+_sent_lock = threading.Lock()
+
+
+def record_sent(layout, view_name, chart):
+    with _sent_lock:
+        count, total = _sent.get((layout, view_name), (0, 0))
+        _sent[(layout, view_name)] = (count + 1, total + len(chart.json))
+
+
+def bytes_sent():
+    """{(layout, view): {'charts': n, 'bytes': total, 'bytes_per_chart': mean}} since startup."""
+    with _sent_lock:
+        return {key: {'charts': count, 'bytes': total, 'bytes_per_chart': total // count}
+                for key, (count, total) in _sent.items()}
@@ -0,0 +1,200 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from filter_index import ALL, year_ranges
+from snapshot import GENRE_BIT, GENRE_MASK, genre_columns
+
+# === Heavy-hitter sketches ===
+# Approximate rating_count totals per title: a Count-Min sketch of
+# SKETCH_DEPTH rows x SKETCH_WIDTH int64 counters plus the
+# SKETCH_CANDIDATES titles with the largest estimates seen so far. Estimates
+# never undercount and overcount by at most SKETCH_ERROR of the sketch's
+# total weight (the width is e / SKETCH_ERROR rounded up to a power of two)
+# with probability 1 - exp(-SKETCH_DEPTH). Sketches with the same shape add
+# counter-wise, so they merge across appended rows, chunks and partitions.
+# Each table takes SKETCH_WIDTH * SKETCH_DEPTH * 8 bytes (64 KiB by
+# default), and a table narrower than the number of titles it counts is
+# mostly collisions, so a sketch that has seen at most SKETCH_EXACT distinct
+# titles keeps exact per-title totals instead and only allocates its table
+# once it grows past that.
+SKETCH_ERROR = 0.002
+SKETCH_WIDTH = 2 ** math.ceil(math.log2(math.e / SKETCH_ERROR))
+SKETCH_DEPTH = 4
+SKETCH_CANDIDATES = 64
+SKETCH_EXACT = SKETCH_WIDTH // 2
+
+_SEEDS = np.random.default_rng(20240601).integers(1, 2 ** 63, size=(2, SKETCH_DEPTH), dtype=np.uint64) | np.uint64(1)
+
+
+def top_k(values, k):
+    """Positions of the ``k`` largest ``values``, largest first.
+
+    Equal values keep their original order, as ``Series.nlargest`` does.
+    Only the candidates above the k-th largest value are sorted.
+    """
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    kth = np.partition(values, len(values) - k)[len(values) - k]
+    above = np.flatnonzero(values > kth)
+    ties = np.flatnonzero(values == kth)[:k - len(above)]
+    top = np.concatenate([above, ties])
+    return top[np.lexsort((top, -values[top]))]
+
+
+def _sum_by_hash(titles, hashes, totals):
+    # One entry per distinct title hash, in hash order.
+    hashes, first, positions = np.unique(hashes, return_index=True, return_inverse=True)
+    return titles[first], hashes, np.bincount(positions, totals, minlength=len(hashes)).astype(np.int64)
+
+
+class HeavyHitters:
+    def __init__(self):
+        self.table = None
+        self.total = 0
+        self.candidates = {}
+        # (titles, hashes, totals) arrays, one entry per title, while there is no table
+        self.exact = (np.empty(0, dtype=object), np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64))
+
+    def _cells(self, hashes):
+        # Multiply-shift hashing of the 64-bit title hashes, one row per seed.
+        shift = np.uint64(64 - int(math.log2(SKETCH_WIDTH)))
+        return ((hashes[None, :] * _SEEDS[0][:, None] + _SEEDS[1][:, None]) >> shift).astype(np.intp)
+
+    def estimate(self, hashes):
+        return self.table[np.arange(SKETCH_DEPTH)[:, None], self._cells(hashes)].min(axis=0)
+
+    def add(self, titles, hashes, weights):
+        """Count per-title ``weights``."""
+        self.total += int(weights.sum())
+        if self.table is None:
+            titles = np.asarray(titles, dtype=object)
+            self.exact = _sum_by_hash(*(np.concatenate(parts) for parts in zip(self.exact, (titles, hashes, weights))))
+            if len(self.exact[0]) > SKETCH_EXACT:
+                self._allocate()
+            return
+        self._count(hashes, weights)
+        self._keep(dict(zip(titles, hashes)))
+
+    def _count(self, hashes, weights):
+        cells = self._cells(hashes)
+        for row in range(SKETCH_DEPTH):
+            self.table[row] += np.bincount(cells[row], weights, minlength=SKETCH_WIDTH).astype(np.int64)
+
+    def _allocate(self):
+        # Move the exact totals into a new table.
+        titles, hashes, totals = self.exact
+        self.table = np.zeros((SKETCH_DEPTH, SKETCH_WIDTH), dtype=np.int64)
+        self.exact = HeavyHitters().exact
+        self._count(hashes, totals.astype(np.float64))
+        self._keep(dict(zip(titles, hashes)))
+
+    def _keep(self, candidates):
+        candidates = {**self.candidates, **candidates}
+        titles = list(candidates)
+        hashes = np.fromiter(candidates.values(), dtype=np.uint64, count=len(titles))
+        top = top_k(self.estimate(hashes), SKETCH_CANDIDATES)
+        self.candidates = {titles[i]: hashes[i] for i in top}
+
+    @classmethod
+    def combine(cls, sketches):
+        sketches = list(sketches)
+        combined = cls()
+        tables = [sketch for sketch in sketches if sketch.table is not None]
+        if tables:
+            combined.table = sum(sketch.table for sketch in tables)
+            combined.total = sum(sketch.total for sketch in tables)
+            combined.candidates = {title: h for sketch in tables for title, h in sketch.candidates.items()}
+        exact = [sketch.exact for sketch in sketches if sketch.table is None]
+        if exact:
+            titles, hashes, totals = (np.concatenate(parts) for parts in zip(*exact))
+            combined.add(titles, hashes, totals.astype(np.float64))
+        elif tables:
+            combined._keep({})
+        return combined
+
+    @property
+    def error_bound(self):
+        return 0 if self.table is None else math.ceil(math.e / SKETCH_WIDTH * self.total)
+
+    def top(self, k):
+        """Estimated top ``k`` titles; ``attrs`` carry the overcount bound and its confidence.
+
+        Without a table the totals are exact and there are no ``attrs``.
+        """
+        if self.table is None:
+            titles, _, totals = self.exact
+            # Ties in title order, as the exact queries break them.
+            order = np.argsort(titles.astype(str), kind='stable')
+            top = order[top_k(totals[order], k)]
+            return pd.DataFrame({'title': titles[top].tolist(), 'rating_count': totals[top]})
+        titles = list(self.candidates)
+        estimates = self.estimate(np.fromiter(self.candidates.values(), dtype=np.uint64, count=len(titles)))
+        top = top_k(estimates, k)
+        result = pd.DataFrame({'title': [titles[i] for i in top], 'rating_count': estimates[top]})
+        result.attrs['error_bound'] = self.error_bound
+        result.attrs['confidence'] = 1 - math.exp(-SKETCH_DEPTH)
+        return result
+
+
+# === Sketch sets ===
+# One sketch per (year, genre) pair including ALL genres (rows without a
+# year under year None), one over all years per genre including ALL, and
+# one per tag. An all-years query reads its genre's sketch rather than
+# adding up the per-year ones.
+SKETCH_COLUMNS = ['year', 'title', 'tag', 'rating_count', GENRE_MASK]
+
+
+def build_sketches(df):
+    titles = df['title'].cat.categories.to_numpy(dtype=object)
+    codes = df['title'].array.codes
+    hashes = pd.util.hash_array(titles)
+    weights = df['rating_count'].to_numpy(dtype=np.float64, na_value=0)
+
+    def sketch(rows):
+        row_codes = codes[rows]
+        keep = row_codes >= 0
+        seen, positions = np.unique(row_codes[keep], return_inverse=True)
+        result = HeavyHitters()
+        result.add(titles[seen], hashes[seen], np.bincount(positions, weights[rows][keep], minlength=len(seen)))
+        return result
+
+    ranges = year_ranges(df)
+    blocks = dict(ranges)
+    blocks[None] = (max((stop for _, stop in ranges.values()), default=0), len(df))
+    mask = df[GENRE_MASK].to_numpy() if GENRE_MASK in df.columns else None
+    by_genre = {ALL: sketch(slice(0, len(df)))} if len(df) else {}
+    for genre in genre_columns(df):
+        rows = np.flatnonzero(mask & np.uint32(1 << GENRE_BIT[genre]))
+        if len(rows):
+            by_genre[genre] = sketch(rows)
+    by_year_genre = {}
+    for year, (start, stop) in blocks.items():
+        if start == stop:
+            continue
+        by_year_genre[(year, ALL)] = sketch(slice(start, stop))
+        for genre in genre_columns(df):
+            rows = start + np.flatnonzero(mask[start:stop] & np.uint32(1 << GENRE_BIT[genre]))
+            if len(rows):
+                by_year_genre[(year, genre)] = sketch(rows)
+
+    by_tag = {}
+    if 'tag' in df.columns:
+        tag_codes = df['tag'].array.codes
+        order = np.argsort(tag_codes, kind='stable')
+        bounds = np.searchsorted(tag_codes[order], np.arange(len(df['tag'].cat.categories) + 1))
+        for code, tag in enumerate(df['tag'].cat.categories):
+            if bounds[code] < bounds[code + 1]:
+                by_tag[tag] = sketch(order[bounds[code]:bounds[code + 1]])
+    return {'genre': by_genre, 'year_genre': by_year_genre, 'tag': by_tag}
+
+
+def merge_sketches(old, new):
+    merged = {}
+    for key in old:
+        merged[key] = dict(old[key])
+        for part, sketch in new[key].items():
+            merged[key][part] = HeavyHitters.combine([merged[key][part], sketch]) if part in merged[key] else sketch
+    return merged
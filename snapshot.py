@@ -0,0 +1,373 @@
+import argparse
+import io
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+# === Dataset schema ===
+GENRE_COLS = ['Action', 'Adventure', 'Animation', 'Children', 'Comedy', 'Crime', 'Documentary',
+              'Drama', 'Fantasy', 'Film-Noir', 'Horror', 'IMAX', 'Musical', 'Mystery',
+              'Romance', 'Sci-Fi', 'Thriller', 'War', 'Western']
+
+WEEKDAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+SCHEMA = {
+    'userId': 'Int32',
+    'movieId': 'Int32',
+    'title': 'category',
+    'tag': 'category',
+    'day_of_week': pd.CategoricalDtype(WEEKDAY_ORDER),
+    'year': 'Int16',
+    'month': 'Int8',
+    'rating': 'float32',
+    'rating_count': 'Int32',
+}
+
+# The 19 genre flags are stored as one bitmask column (bit i set for
+# GENRE_COLS[i]); the genres the source actually had are listed in
+# ``df.attrs['genre_cols']``.
+GENRE_MASK = 'genres'
+GENRE_BIT = {g: i for i, g in enumerate(GENRE_COLS)}
+
+# Columns each view reads; the sidebar always needs year and tag.
+SIDEBAR_COLUMNS = ['year', 'tag']
+VIEW_COLUMNS = {
+    'Top Movies': ['title', 'rating_count', 'year', 'tag'],
+    'Trending Now': ['title', 'rating_count', 'year'],
+    'Average Rating Over Years': ['year', 'rating'],
+    'Genre Popularity': ['year', 'rating_count'],
+    'Movies by Tags': ['title', 'rating_count', 'tag'],
+    'Monthly Trends': ['month', 'day_of_week', 'rating'],
+    'Weekly Trends': ['month', 'day_of_week', 'rating'],
+}
+GENRE_VIEWS = {'Top Movies', 'Average Rating Over Years', 'Genre Popularity', 'Monthly Trends', 'Weekly Trends'}
+
+SNAPSHOT_FORMATS = {'.parquet': 'parquet', '.feather': 'feather', '.arrays': 'arrays'}
+
+
+def columns_for(views, genre_cols=GENRE_COLS):
+    columns = list(SIDEBAR_COLUMNS)
+    for view in views:
+        columns += VIEW_COLUMNS[view]
+        if view in GENRE_VIEWS:
+            columns += genre_cols
+    return list(dict.fromkeys(columns))
+
+
+def apply_schema(df):
+    for col, dtype in SCHEMA.items():
+        if col not in df.columns:
+            continue
+        if dtype in ('Int32', 'Int16', 'Int8'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').round().astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    return pack_genres(df)
+
+
+def pack_genres(df):
+    """Replace the per-genre flag columns of ``df`` with the GENRE_MASK column."""
+    genres = [g for g in GENRE_COLS if g in df.columns]
+    if not genres:
+        return df
+    mask = np.zeros(len(df), dtype=np.uint32)
+    for genre in genres:
+        flags = pd.to_numeric(df[genre], errors='coerce').fillna(0).to_numpy() != 0
+        mask |= flags.astype(np.uint32) << GENRE_BIT[genre]
+    df = df.drop(columns=genres)
+    df[GENRE_MASK] = mask
+    df.attrs['genre_cols'] = genres
+    return df
+
+
+def genre_columns(df):
+    """Genres present in ``df``'s GENRE_MASK column."""
+    return list(df.attrs.get('genre_cols', [])) if GENRE_MASK in df.columns else []
+
+
+def genre_flags(mask, genres):
+    """(rows, len(genres)) 0/1 matrix of ``genres`` unpacked from a GENRE_MASK array."""
+    bits = np.array([GENRE_BIT[g] for g in genres], dtype=np.uint32)
+    return (mask[:, None] >> bits) & 1
+
+
+# === Snapshot files ===
+def snapshot_path(source, fmt='parquet'):
+    return os.path.splitext(source)[0] + '.' + fmt
+
+
+def find_snapshot(source):
+    """Return the newest snapshot written next to ``source``, if any."""
+    paths = [snapshot_path(source, fmt) for fmt in SNAPSHOT_FORMATS.values()]
+    # An arrays snapshot without its metadata is unfinished, or from a
+    # version that pickled it, and is never read.
+    paths = [p for p in paths if os.path.exists(os.path.join(p, ARRAYS_META) if p.endswith('.arrays') else p)]
+    return max(paths, key=lambda p: os.stat(p).st_mtime_ns, default=None)
+
+
+def snapshot_covers(df, source, snapshot):
+    """Whether a snapshot frame is a prefix of ``source`` (or, lacking offsets, not older than it)."""
+    offset = df.attrs.get('source_offset')
+    if offset is None:
+        return os.stat(snapshot).st_mtime_ns >= os.stat(source).st_mtime_ns
+    return csv_tail(source, offset) == df.attrs.get('source_tail')
+
+
+def snapshot_columns(path):
+    fmt = SNAPSHOT_FORMATS[os.path.splitext(path)[1]]
+    if fmt == 'arrays':
+        return [column['name'] for column in _read_arrays_meta(path)['columns']]
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    import pyarrow as pa
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def read_snapshot(path, columns=None):
+    if columns is not None:
+        available = set(snapshot_columns(path))
+        if GENRE_MASK in available and any(c in GENRE_BIT for c in columns):
+            columns = list(columns) + [GENRE_MASK]
+        columns = [c for c in columns if c in available]
+    fmt = SNAPSHOT_FORMATS[os.path.splitext(path)[1]]
+    if fmt == 'arrays':
+        df = read_arrays(path, columns)
+    elif fmt == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_feather(path, columns=columns)
+    # Snapshots written before genres were packed still hold one column per genre.
+    return pack_genres(df)
+
+
+# === Memory-mapped arrays ===
+# The 'arrays' snapshot is a directory holding every column as raw .npy
+# buffers (category codes, nullable-int values and NA mask, or the plain
+# array) plus a JSON file of column names, dtypes (with category values)
+# and the frame's attrs; nothing in it is unpickled. Reading it maps the
+# buffers read-only instead of copying them, so every dashboard process on
+# a host shares one copy of the data through the page cache.
+#
+# Each write goes to a new hidden version directory next to it
+# (``.<name>.<ns>``), and ``<name>.arrays`` is a symlink swapped to it in
+# one rename, so the snapshot path always names a complete version.
+# Readers resolve the link once and read every file of that version; the
+# version before the newest is kept for readers that resolved it just
+# before the swap, older ones are removed.
+ARRAYS_META = 'meta.json'
+
+
+def _dtype_meta(dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        return {'categories': dtype.categories.tolist(), 'ordered': bool(dtype.ordered)}
+    return {'dtype': str(dtype)}
+
+
+def _dtype_from_meta(meta):
+    if 'categories' in meta:
+        return pd.CategoricalDtype(meta['categories'], ordered=meta['ordered'])
+    return pd.api.types.pandas_dtype(meta['dtype'])
+
+
+def _read_arrays_meta(path):
+    with open(os.path.join(path, ARRAYS_META)) as f:
+        return json.load(f)
+
+
+def column_buffers(series):
+    """The numpy buffers ``series`` is rebuilt from by :func:`column_from_buffers`."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return {'codes': series.array.codes}
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return {'data': series.to_numpy(dtype=dtype.numpy_dtype, na_value=0), 'mask': series.isna().to_numpy()}
+    return {'data': series.to_numpy()}
+
+
+def column_from_buffers(dtype, arrays):
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Codes were written from a column of this dtype; validating them
+        # would copy the whole array.
+        return pd.Categorical.from_codes(arrays['codes'], dtype=dtype, validate=False)
+    if 'mask' in arrays:
+        return dtype.construct_array_type()(arrays['data'], arrays['mask'])
+    return arrays['data']
+
+
+def _arrays_versions(path):
+    """Version directories of the arrays snapshot at ``path``, oldest first."""
+    directory, name = os.path.split(os.path.abspath(path))
+    prefix = '.%s.' % name
+    versions = [entry.path for entry in os.scandir(directory)
+                if entry.name.startswith(prefix) and entry.name[len(prefix):].isdigit()]
+    return sorted(versions, key=lambda p: int(p.rsplit('.', 1)[1]))
+
+
+def write_arrays(df, path):
+    path = os.path.abspath(path)
+    directory, name = os.path.split(path)
+    version = os.path.join(directory, '.%s.%d' % (name, time.time_ns()))
+    os.makedirs(version)
+    columns = []
+    for i, col in enumerate(df.columns):
+        parts = []
+        for part, array in column_buffers(df[col]).items():
+            np.save(os.path.join(version, '%d.%s.npy' % (i, part)), array)
+            parts.append(part)
+        columns.append(dict(_dtype_meta(df[col].dtype), name=col, parts=parts))
+    with open(os.path.join(version, ARRAYS_META), 'w') as f:
+        json.dump({'attrs': df.attrs, 'columns': columns}, f)
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+    if os.path.isdir(path) and not os.path.islink(path):
+        # A snapshot written before versioning; it cannot be swapped in one rename.
+        shutil.rmtree(path)
+    link = path + '.tmp'
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version), link)
+    os.replace(link, path)
+    # Processes still mapping a removed version keep their files open.
+    keep = {os.path.realpath(version), previous}
+    for old in _arrays_versions(path):
+        if os.path.realpath(old) not in keep:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def read_arrays(path, columns=None):
+    path = os.path.realpath(path)
+    meta = _read_arrays_meta(path)
+    data = {}
+    for i, column in enumerate(meta['columns']):
+        col = column['name']
+        if columns is not None and col not in columns:
+            continue
+        arrays = {part: np.load(os.path.join(path, '%d.%s.npy' % (i, part)), mmap_mode='r') for part in column['parts']}
+        data[col] = column_from_buffers(_dtype_from_meta(column), arrays)
+    df = pd.DataFrame(data, copy=False)
+    df.attrs = meta['attrs']
+    return df
+
+
+# === CSV sources ===
+# CSV exports only ever grow by appended lines, so a parsed frame records the
+# byte offset it covers (``source_offset``) plus the bytes just before it
+# (``source_tail``). A later read can then check the file was appended to
+# rather than rewritten and parse only the new lines. A full read takes the
+# whole file, including a last line without a newline; only the append
+# catch-up stops at the last complete line (csv_extent), since a line still
+# being written may be unfinished.
+TAIL_BYTES = 64
+
+
+def csv_extent(path):
+    """Byte offset just past the last complete line of ``path``."""
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            start = max(0, pos - 65536)
+            f.seek(start)
+            newline = f.read(pos - start).rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            pos = start
+    return 0
+
+
+def csv_line_start(path, offset):
+    """Whether bytes from ``offset`` on start a new line rather than continue the one before it."""
+    if offset == 0:
+        return True
+    with open(path, 'rb') as f:
+        f.seek(offset - 1)
+        around = f.read(2)
+    return around[:1] == b'\n' or around[1:] in (b'\n', b'\r')
+
+
+def csv_tail(path, offset):
+    with open(path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) < offset:
+            return None
+        f.seek(max(0, offset - TAIL_BYTES))
+        return f.read(min(offset, TAIL_BYTES)).hex()
+
+
+class _CsvRange(io.RawIOBase):
+    """File-like over ``prefix`` followed by bytes ``[start, end)`` of ``f``."""
+
+    def __init__(self, f, prefix, start, end):
+        f.seek(start)
+        self._f = f
+        self._prefix = prefix
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        data = self._f.read(min(len(buffer), self._remaining))
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def iter_csv_typed(path, columns=None, chunksize=None, start=0, end=None):
+    """Parse bytes ``[start, end)`` of a CSV export (the whole file by default) with the schema applied.
+
+    Yields a single frame, or frames of ``chunksize`` rows. Every frame
+    carries the ``source_offset``/``source_tail`` of ``end``.
+    """
+    if end is None:
+        end = os.path.getsize(path)
+    tail = csv_tail(path, end)
+    usecols = None if columns is None else (lambda c: c in columns)
+    dtype = {c: t for c, t in SCHEMA.items() if t in ('category', 'float32')}
+    dtype.update({g: 'float32' for g in GENRE_COLS})
+    with open(path, 'rb') as f:
+        header = f.readline() if start else b''
+        source = io.BufferedReader(_CsvRange(f, header, start, end))
+        reader = pd.read_csv(source, usecols=usecols, dtype=dtype, chunksize=chunksize)
+        for df in ([reader] if chunksize is None else reader):
+            df = apply_schema(df)
+            df.attrs['source_offset'] = end
+            df.attrs['source_tail'] = tail
+            yield df
+
+
+def read_csv_typed(path, columns=None, start=0, end=None):
+    return next(iter_csv_typed(path, columns, start=start, end=end))
+
+
+def write_snapshot(source, fmt='parquet'):
+    # Written in year order so loading it is already sorted for the filter index.
+    df = read_csv_typed(source).sort_values('year', kind='stable', na_position='last', ignore_index=True)
+    path = snapshot_path(source, fmt)
+    if fmt == 'arrays':
+        write_arrays(df, path)
+    elif fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_feather(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a dashboard CSV export into a typed columnar snapshot.")
+    parser.add_argument('source', help="CSV export, e.g. dashboard_df.xls")
+    parser.add_argument('--format', choices=sorted(set(SNAPSHOT_FORMATS.values())), default='parquet')
+    args = parser.parse_args()
+    print(write_snapshot(args.source, args.format))
+
+
+if __name__ == '__main__':
+    main()
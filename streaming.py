@@ -0,0 +1,37 @@
+from aggregates import (get_cube, get_genre_year_table, get_sketches, get_tag_title_counts, get_time_rollup,
+                        has_time_rollup)
+from data_loader import Dataset, sort_by_year
+from snapshot import iter_csv_typed
+from views import filter_options
+
+# Aggregates a streamed dataset carries; together they answer every view
+# without the raw rows (see Dataset.streamed). The time rollup is only
+# built when the monthly/weekly columns were loaded, the heavy-hitter
+# sketches only for approximate mode.
+STREAMED_AGGREGATES = [get_cube, get_genre_year_table, get_tag_title_counts, filter_options]
+
+
+def _chunk_aggregates(chunk, sketches):
+    return (STREAMED_AGGREGATES + ([get_time_rollup] if has_time_rollup(chunk) else [])
+            + ([get_sketches] if sketches else []))
+
+
+# === Chunked aggregation ===
+# The CSV source is parsed ``chunksize`` rows at a time; each chunk is reduced
+# to the aggregates above and folded into the running totals, so memory is
+# bounded by the number of distinct (year, genre, title, tag) keys rather
+# than by the number of ratings.
+def stream_dataset(path, signature, columns=None, chunksize=1_000_000, source=None, sketches=False):
+    source = source or path
+    dataset = None
+    for chunk in iter_csv_typed(source, columns, chunksize):
+        chunk_dataset = Dataset(sort_by_year(chunk), path, signature, columns, source=source)
+        for build in _chunk_aggregates(chunk, sketches):
+            build(chunk_dataset)
+        if dataset is None:
+            dataset = Dataset(chunk.iloc[:0], path, signature, columns, streamed=True, source=source)
+        dataset.absorb(chunk_dataset)
+    if dataset is None:
+        dataset = Dataset(next(iter_csv_typed(source, columns)), path, signature, columns, streamed=True,
+                          source=source)
+    return dataset
@@ -1,134 +1,62 @@
-
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+from widgets import diagnostics_page, sidebar_filters, sidebar_options
 
 
-dashboard_df = pd.read_csv("dashboard_df.xls")
-# ===== Genre columns (adjust based on your dataset) =====
-genre_cols = ['Action', 'Comedy', 'Drama']
+# Figures built by this layout are cached under this name (see figure_cache.py)
+LAYOUT = 'test_dashboard'
+THEME = 'plain'
 
-# ===== Sidebar Filters =====
-st.sidebar.title("Filters")
+# Open with ?diagnostics in the URL for stage timings (see metrics.py)
+if diagnostics_page():
+    st.stop()
 
-year_options = ['All'] + sorted(dashboard_df['year'].dropna().unique().tolist())
-selected_year = st.sidebar.selectbox("Select Year", year_options)
+views = ["Top Movies", "Trending Now", "Average Rating Over Years", "Genre Popularity", "Movies by Tags"]
 
-genre_options = ['All'] + genre_cols
-selected_genre = st.sidebar.selectbox("Select Genre", genre_options)
+# ===== Sidebar Filters (from the metadata sidecar, before the data and chart libraries load) =====
+options = sidebar_options("dashboard_df.xls", views)
+filters = sidebar_filters(options)
 
-tag_options = sorted(dashboard_df['tag'].dropna().unique())
-selected_tags = st.sidebar.multiselect("Select Tags (multiple)", tag_options)
+from dashboard_core import open_dataset, show_view  # noqa: E402 (loads pandas and plotly)
+from views import VIEWS  # noqa: E402
 
-# ===== Filter function =====
-def filter_movies(df, year, genre, tags):
-    if year != 'All':
-        df = df[df['year'] == year]
-    if genre != 'All' and genre in df.columns:
-        df = df[df[genre] == 1]
-    if tags:
-        df = df[df['tag'].isin(tags)]
-    return df
+dataset = open_dataset("dashboard_df.xls", views)
 
-filtered_df = filter_movies(dashboard_df, selected_year, selected_genre, selected_tags)
+# ===== Views (top movies here also honour the tag filter) =====
+page_views = {name: VIEWS[name] for name in views}
+page_views['Top Movies'] = page_views['Top Movies'].with_inputs(('year', 'genre', 'tags', 'approximate'))
 
 st.markdown("<h1 style='text-align:center; color:yellow;'>Movie Dashboard</h1>", unsafe_allow_html=True)
 
+# Only the selected chart is computed and rendered on each rerun.
+selected_view = st.radio("Select View", views, horizontal=True)
+view = page_views[selected_view]
+
 # ===== 1. Top Movies by Rating Count =====
-st.subheader("Top Movies by Rating Count")
-if filtered_df.empty:
-    st.warning("No movies found with current filters.")
-else:
-    top_movies = filtered_df.groupby('title')['rating_count'].sum().reset_index().sort_values('rating_count', ascending=False).head(6)
-    fig1 = px.bar(top_movies, x='rating_count', y='title', orientation='h', color_discrete_sequence=['#FFD700'])
-    fig1.update_layout(
-        plot_bgcolor='black',
-        paper_bgcolor='black',
-        font_color='yellow',
-        title_font_size=22,
-        title_x=0.5,
-        xaxis=dict(showgrid=False),
-        yaxis=dict(showgrid=False),
-        title="Top Movies by Rating Count"
-    )
-    st.plotly_chart(fig1, use_container_width=True)
+if selected_view == "Top Movies":
+    st.subheader("Top Movies by Rating Count")
+    show_view(LAYOUT, dataset, view, filters, "Top Movies by Rating Count", THEME,
+              "No movies found with current filters.")
 
 # ===== 2. Trending Movies (Last 5 years) =====
-st.subheader("Trending Movies (Last 5 Years)")
-recent_year = dashboard_df['year'].max() - 5
-trending = dashboard_df[dashboard_df['year'] >= recent_year]
-trending_top = trending.groupby('title')['rating_count'].sum().reset_index().sort_values('rating_count', ascending=False).head(10)
-fig2 = px.bar(trending_top, x='rating_count', y='title', orientation='h', color_discrete_sequence=['#FFD700'])
-fig2.update_layout(
-    plot_bgcolor='black',
-    paper_bgcolor='black',
-    font_color='yellow',
-    title_font_size=22,
-    title_x=0.5,
-    xaxis=dict(showgrid=False),
-    yaxis=dict(showgrid=False),
-    title="Trending Movies (Last 5 Years)"
-)
-st.plotly_chart(fig2, use_container_width=True)
+if selected_view == "Trending Now":
+    st.subheader("Trending Movies (Last 5 Years)")
+    show_view(LAYOUT, dataset, view, filters, "Trending Movies (Last 5 Years)", THEME)
 
 # ===== 3. Average Rating Over Years =====
-st.subheader("Average Rating Over Years")
-avg_rating_df = dashboard_df.copy()
-if selected_genre != 'All' and selected_genre in avg_rating_df.columns:
-    avg_rating_df = avg_rating_df[avg_rating_df[selected_genre] == 1]
-trend = avg_rating_df.groupby('year').agg(avg_rating=('rating', 'mean')).reset_index()
-fig3 = px.line(trend, x='year', y='avg_rating', markers=True, color_discrete_sequence=['#FFD700'])
-fig3.update_layout(
-    plot_bgcolor='black',
-    paper_bgcolor='black',
-    font_color='yellow',
-    title_font_size=22,
-    title_x=0.5,
-    xaxis=dict(showgrid=False),
-    yaxis=dict(showgrid=False),
-    title="Average Rating Over Years"
-)
-st.plotly_chart(fig3, use_container_width=True)
+if selected_view == "Average Rating Over Years":
+    st.subheader("Average Rating Over Years")
+    show_view(LAYOUT, dataset, view, filters, "Average Rating Over Years", THEME, labels={'rating': 'avg_rating'})
 
 # ===== 4. Genre Popularity =====
-st.subheader("Genre Popularity")
-genre_df = dashboard_df.copy()
-if selected_year != 'All':
-    genre_df = genre_df[genre_df['year'] == selected_year]
-genre_counts = {g: genre_df[genre_df[g] == 1]['rating_count'].sum() for g in genre_cols}
-genre_pop_df = pd.DataFrame(list(genre_counts.items()), columns=['Genre', 'Rating Count']).sort_values('Rating Count', ascending=False)
-fig4 = px.bar(genre_pop_df, x='Rating Count', y='Genre', orientation='h', color_discrete_sequence=['#FFD700'])
-fig4.update_layout(
-    plot_bgcolor='black',
-    paper_bgcolor='black',
-    font_color='yellow',
-    title_font_size=22,
-    title_x=0.5,
-    xaxis=dict(showgrid=False),
-    yaxis=dict(showgrid=False),
-    title="Genre Popularity"
-)
-st.plotly_chart(fig4, use_container_width=True)
+if selected_view == "Genre Popularity":
+    st.subheader("Genre Popularity")
+    show_view(LAYOUT, dataset, view, filters, "Genre Popularity", THEME)
 
 # ===== 5. Movies by Tags =====
-st.subheader("Movies by Tags")
-if not selected_tags:
-    st.info("Select at least one tag to filter movies by tags.")
-else:
-    tags_df = dashboard_df[dashboard_df['tag'].isin(selected_tags)]
-    if tags_df.empty:
-        st.warning("No movies found for the selected tag(s).")
+if selected_view == "Movies by Tags":
+    st.subheader("Movies by Tags")
+    if not filters['tags']:
+        st.info("Select at least one tag to filter movies by tags.")
     else:
-        tag_counts = tags_df.groupby('title')['rating_count'].sum().reset_index().sort_values('rating_count', ascending=False).head(10)
-        fig5 = px.bar(tag_counts, x='rating_count', y='title', orientation='h', color_discrete_sequence=['#FFD700'])
-        fig5.update_layout(
-            plot_bgcolor='black',
-            paper_bgcolor='black',
-            font_color='yellow',
-            title_font_size=22,
-            title_x=0.5,
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=False),
-            title="Movies Matching Selected Tags"
-        )
-        st.plotly_chart(fig5, use_container_width=True)
+        show_view(LAYOUT, dataset, view, filters, "Movies Matching Selected Tags", THEME,
+                  "No movies found for the selected tag(s).")
@@ -0,0 +1,53 @@
+from figure_cache import FigureCache
+
+
+class Payload:
+    def __init__(self, size):
+        self.size = size
+
+    def to_json(self):
+        return 'x' * self.size
+
+
+def key(name, version=1, path='ratings.csv'):
+    return ('layout', path, version, name, ())
+
+
+def test_hits_and_least_recently_used_eviction():
+    cache = FigureCache(max_entries=2)
+    built = []
+
+    def build(name):
+        return lambda: built.append(name) or Payload(1)
+
+    a = cache.get_or_build(key('a'), build('a'))
+    cache.get_or_build(key('b'), build('b'))
+    assert cache.get_or_build(key('a'), build('a')) is a
+    cache.get_or_build(key('c'), build('c'))
+    # 'b' was used least recently.
+    cache.get_or_build(key('a'), build('a'))
+    cache.get_or_build(key('b'), build('b'))
+    assert built == ['a', 'b', 'c', 'b']
+    assert cache.stats() == {'hits': 2, 'misses': 4, 'entries': 2, 'bytes': 2}
+
+
+def test_byte_limit():
+    cache = FigureCache(max_bytes=10)
+    cache.get_or_build(key('a'), lambda: Payload(4))
+    cache.get_or_build(key('b'), lambda: Payload(4))
+    cache.get_or_build(key('c'), lambda: Payload(4))
+    assert cache.stats()['entries'] == 2 and cache.stats()['bytes'] == 8
+    # Larger than the whole cache: handed out but not kept.
+    cache.get_or_build(key('d'), lambda: Payload(11))
+    assert cache.stats()['entries'] == 2
+
+
+def test_newer_version_drops_older_entries():
+    cache = FigureCache()
+    cache.get_or_build(key('a', version=1), lambda: Payload(1))
+    cache.get_or_build(key('a', version=1, path='other.csv'), lambda: Payload(1))
+    cache.get_or_build(key('a', version=2), lambda: Payload(1))
+    assert cache.stats()['entries'] == 2
+    # A rerun still holding version 1 gets its figure built, but not cached.
+    old = cache.get_or_build(key('a', version=1), lambda: Payload(1))
+    assert old is not None and cache.stats()['entries'] == 2
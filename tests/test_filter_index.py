@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import sort_by_year
+from filter_index import ALL, FilterIndex
+from snapshot import GENRE_BIT, apply_schema
+
+
+def frame():
+    df = pd.DataFrame({
+        'title': list('ABCDEFGH'),
+        'year': [2001, 2000, None, 2001, 2000, 2002, 2001, None],
+        'tag': ['x', 'y', 'x', None, 'x', 'y', 'y', 'z'],
+        'rating_count': 1,
+        'Drama': [1, 0, 1, 1, 0, 1, 0, 0],
+        'Comedy': [0, 1, 0, 1, 1, 0, 0, 1],
+    })
+    return sort_by_year(apply_schema(df))
+
+
+def expected(df, year=ALL, genre=ALL, tags=None):
+    keep = np.ones(len(df), dtype=bool)
+    if year != ALL:
+        keep &= (df['year'] == year).fillna(False).to_numpy()
+    if genre != ALL:
+        keep &= (df['genres'].to_numpy() & np.uint32(1 << GENRE_BIT[genre])) != 0
+    if tags:
+        keep &= df['tag'].isin(tags).to_numpy()
+    return np.flatnonzero(keep).tolist()
+
+
+def test_rows_match_boolean_masks():
+    df = frame()
+    index = FilterIndex(df)
+    for year in [ALL, 2000, 2001, 2002, 1999]:
+        for genre in [ALL, 'Drama', 'Comedy']:
+            for tags in [None, ['x'], ['y', 'z'], ['missing']]:
+                rows = index.rows(year, genre, tags)
+                assert np.arange(len(df))[rows].tolist() == expected(df, year, genre, tags), (year, genre, tags)
+
+
+def test_year_only_is_a_slice():
+    index = FilterIndex(frame())
+    assert index.rows(2001) == slice(2, 5)
+    assert index.rows() == slice(0, 8)
+    # A genre the frame has no flags for filters nothing.
+    assert index.rows(2001, 'Western') == slice(2, 5)
@@ -0,0 +1,103 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data_loader
+from aggregates import build_cube, merge_cube, top_titles
+from data_loader import Dataset, load_dataset
+from snapshot import GENRE_COLS, read_csv_typed
+
+# One title whose rating_count total (3e9 over both halves) does not fit in
+# the Int32 the column is stored as.
+ROWS = 15000
+RATING_COUNT = 100_000
+
+
+def ratings(rows):
+    df = pd.DataFrame({
+        'userId': 1, 'movieId': 1, 'title': 'A', 'rating': 4.0, 'tag': 'tag', 'year': 2005, 'month': 1,
+        'day_of_week': 'Monday', 'rating_count': RATING_COUNT,
+    }, index=range(rows))
+    return df.assign(**{genre: 1 for genre in GENRE_COLS})
+
+
+@pytest.fixture(autouse=True)
+def inline_refresh(monkeypatch):
+    monkeypatch.setattr(data_loader, 'REFRESH_INTERVAL', None)
+
+
+def top_count(dataset):
+    return int(top_titles(dataset, k=1)['rating_count'].iloc[0])
+
+
+def test_append_merge_does_not_overflow(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    ratings(ROWS).to_csv(path, index=False)
+    dataset = load_dataset(path)
+    assert top_count(dataset) == ROWS * RATING_COUNT
+    ratings(ROWS).to_csv(path, mode='a', header=False, index=False)
+    appended = load_dataset(path)
+    assert appended is not dataset
+    assert top_count(appended) == 2 * ROWS * RATING_COUNT
+
+
+def test_chunk_merge_does_not_overflow(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    ratings(2 * ROWS).to_csv(path, index=False)
+    assert top_count(load_dataset(path, chunksize=10_000)) == 2 * ROWS * RATING_COUNT
+
+
+def test_partition_merge_does_not_overflow(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    ratings(2 * ROWS).to_csv(path, index=False)
+    df = read_csv_typed(path)
+    cube = merge_cube(build_cube(df.iloc[:ROWS]), build_cube(df.iloc[ROWS:]))
+    dataset = Dataset(df.iloc[:0], path, None)
+    dataset.derived('cube', lambda ds: cube)
+    assert top_count(dataset) == 2 * ROWS * RATING_COUNT
+
+
+def test_chunked_load_without_time_columns(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    ratings(2 * ROWS).to_csv(path, index=False)
+    dataset = load_dataset(path, columns=['year', 'title', 'rating_count', 'tag'], chunksize=10_000)
+    assert top_count(dataset) == 2 * ROWS * RATING_COUNT
+    assert 'time_rollup' not in dataset._derived
+
+
+def test_last_line_without_newline(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    text = ratings(2).to_csv(index=False)
+    with open(path, 'w') as f:
+        f.write(text.rstrip('\n'))
+    dataset = load_dataset(path)
+    assert len(dataset.df) == 2
+    # A newline and more rows: the appended rows are caught up.
+    with open(path, 'a') as f:
+        f.write('\n' + ratings(3).to_csv(index=False, header=False))
+    appended = load_dataset(path)
+    assert len(appended.df) == 5 and top_count(appended) == 5 * RATING_COUNT
+    # The unterminated line extended instead: read again from scratch.
+    with open(path, 'w') as f:
+        f.write(text.rstrip('\n'))
+    assert len(load_dataset(path).df) == 2
+    with open(path, 'a') as f:
+        f.write('0\n')
+    extended = load_dataset(path)
+    assert len(extended.df) == 2 and extended.offset == os.path.getsize(path)
+
+
+def test_append_keeps_year_order(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    pd.concat([ratings(2).assign(year=2010), ratings(2).assign(year=None)]).to_csv(path, index=False)
+    dataset = load_dataset(path)
+    top_titles(dataset, year=2010)
+    # Rows for an earlier and a later year land in their own year blocks.
+    pd.concat([ratings(1).assign(year=2000, title='B'), ratings(1).assign(year=2020, title='C')]).to_csv(
+        path, mode='a', header=False, index=False)
+    appended = load_dataset(path)
+    assert appended.df['year'].tolist()[:4] == [2000, 2010, 2010, 2020]
+    assert appended.df['year'].isna().tolist() == [False] * 4 + [True] * 2
+    assert top_titles(appended, year=2000)['title'].tolist() == ['B']
+    assert top_titles(appended, year=2010)['title'].tolist() == ['A']
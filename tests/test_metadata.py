@@ -0,0 +1,43 @@
+import os
+
+from metadata import metadata_path, read_metadata, write_metadata
+
+
+def write(path, text, mtime):
+    with open(path, 'w') as f:
+        f.write(text)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def test_sidecar_is_read_until_the_source_changes(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    write(path, 'title\nA\n', 1_000_000_000)
+    write_metadata(path, path, signature(path), {'year': [2005]})
+    assert os.path.exists(metadata_path(path))
+    assert read_metadata(path, ['year'])['year'] == [2005]
+    # Missing keys read as no sidecar; keys written for the same version add up.
+    assert read_metadata(path, ['year', 'months']) is None
+    write_metadata(path, path, signature(path), {'months': [24060]})
+    assert read_metadata(path, ['year', 'months'])['months'] == [24060]
+    write(path, 'title\nA\nB\n', 2_000_000_000)
+    assert read_metadata(path) is None
+    # A sidecar for the new version does not keep the old version's keys.
+    write_metadata(path, path, signature(path), {'year': [2006]})
+    assert read_metadata(path, ['months']) is None
+
+
+def test_sidecar_of_a_drop_directory_follows_the_newest_file(tmp_path):
+    first = str(tmp_path / 'a.csv')
+    write(first, 'title\nA\n', 1_000_000_000)
+    write_metadata(str(tmp_path), first, signature(first), {'year': [2005]})
+    assert read_metadata(str(tmp_path), ['year']) is not None
+    write(str(tmp_path / 'b.csv'), 'title\nB\n', 2_000_000_000)
+    assert read_metadata(str(tmp_path), ['year']) is None
+    os.remove(str(tmp_path / 'b.csv'))
+    os.remove(first)
+    assert read_metadata(str(tmp_path)) is None
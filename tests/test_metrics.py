@@ -0,0 +1,39 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics import prometheus_text, record, reset, serve
+
+
+def test_serve_on_loopback():
+    server = serve(0, text=lambda: 'dashboard_up 1\n')
+    try:
+        host, port = server.server_address
+        assert host == '127.0.0.1'
+        with urllib.request.urlopen('http://127.0.0.1:%d/metrics' % port) as response:
+            assert response.read() == b'dashboard_up 1\n'
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen('http://127.0.0.1:%d/other' % port)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_prometheus_text_format():
+    reset()
+    record('query', 0.5, rows=10, view='Top "Movies"', year='2005')
+    record('query', 1.5, rows=5, view='Top "Movies"', year='2005')
+    text = prometheus_text([('dashboard_charts_sent_total', 'counter', "Charts sent.", [({'view': 'Top'}, 3)])])
+    reset()
+    lines = text.splitlines()
+    labels = 'stage="query",view="Top \\"Movies\\"",year="2005"'
+    assert '# TYPE dashboard_stage_seconds summary' in lines
+    assert 'dashboard_stage_seconds{quantile="0.5",%s} 1.000000' % labels in lines
+    assert 'dashboard_stage_seconds_sum{%s} 2.000000' % labels in lines
+    assert 'dashboard_stage_seconds_count{%s} 2' % labels in lines
+    assert 'dashboard_stage_rows_total{%s} 15' % labels in lines
+    assert lines[-3:] == ['# HELP dashboard_charts_sent_total Charts sent.',
+                          '# TYPE dashboard_charts_sent_total counter',
+                          'dashboard_charts_sent_total{view="Top"} 3']
+    assert text.endswith('\n')
@@ -0,0 +1,55 @@
+import gc
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import parallel
+from aggregates import CUBE_COLUMNS, build_cube, merge_cube
+from parallel import map_partitions, shared_frame
+from snapshot import GENRE_MASK, apply_schema
+
+
+def ratings(rows):
+    rng = np.random.default_rng(0)
+    return apply_schema(pd.DataFrame({
+        'title': rng.choice(['A', 'B', 'C'], rows), 'year': np.sort(rng.integers(2000, 2005, rows)),
+        'rating': rng.random(rows) * 5, 'rating_count': rng.integers(1, 100, rows),
+        'Drama': rng.integers(0, 2, rows), 'Comedy': rng.integers(0, 2, rows),
+    }))
+
+
+@pytest.fixture
+def two_workers(monkeypatch):
+    monkeypatch.setattr(parallel, 'MAX_WORKERS', 2)
+    monkeypatch.setattr(parallel, 'PARALLEL_MIN_ROWS', 0)
+
+
+def test_partitions_match_a_single_build(two_workers):
+    df = ratings(1000)
+    parts = map_partitions(df, build_cube, merge_cube, CUBE_COLUMNS)
+    whole = build_cube(df)
+    assert parts.keys() == whole.keys()
+    for genre in whole:
+        pd.testing.assert_frame_equal(parts[genre].sort_index(), whole[genre].sort_index(), check_dtype=False)
+
+
+def test_frame_is_shared_once_and_read_without_copies(two_workers):
+    df = ratings(100)
+    shared = shared_frame(df)
+    assert shared_frame(df) is shared
+    partition = parallel._read_partition(shared.spec(), 10, 20, ['year', 'title', GENRE_MASK])
+    blocks = [np.ndarray(shape, dtype, buffer=parallel._attached[name].buf)
+              for _, specs in shared.columns.values() for name, shape, dtype in specs.values()]
+    for values in [partition['year'].array._data, partition['year'].array._mask, partition['title'].array.codes,
+                   partition[GENRE_MASK].to_numpy()]:
+        assert any(np.shares_memory(values, block) for block in blocks)
+    del partition, blocks
+    names = [name for _, specs in shared.columns.values() for name, _, _ in specs.values()]
+    parallel._attach(set())
+    del df, shared
+    gc.collect()
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
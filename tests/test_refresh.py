@@ -0,0 +1,74 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data_loader
+from data_loader import load_dataset, refresh_datasets
+from metadata import resolve_source
+
+
+@pytest.fixture(autouse=True)
+def manual_refresh(monkeypatch):
+    # Versions are only swapped in by the refresh_datasets calls below.
+    monkeypatch.setattr(data_loader, 'REFRESH_INTERVAL', 2.0)
+    monkeypatch.setattr(data_loader, '_start_refresher', lambda: None)
+
+
+def write_ratings(path, titles, mtime=None):
+    pd.DataFrame({'title': titles, 'year': 2005, 'rating_count': 1, 'tag': 'tag'}).to_csv(path, index=False)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def append_ratings(path, titles):
+    pd.DataFrame({'title': titles, 'year': 2005, 'rating_count': 1, 'tag': 'tag'}).to_csv(
+        path, mode='a', header=False, index=False)
+
+
+def test_change_is_swapped_in_once_settled(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    write_ratings(path, ['A'])
+    dataset = load_dataset(path)
+    append_ratings(path, ['B'])
+    refresh_datasets()
+    assert load_dataset(path) is dataset
+    # Still being written: the change has to hold for a whole check again.
+    append_ratings(path, ['C'])
+    refresh_datasets()
+    assert load_dataset(path) is dataset
+    refresh_datasets()
+    refreshed = load_dataset(path)
+    assert refreshed.version > dataset.version
+    assert refreshed.df['title'].tolist() == ['A', 'B', 'C']
+    assert dataset.df['title'].tolist() == ['A']
+
+
+def test_drop_directory_follows_newest_file(tmp_path):
+    write_ratings(str(tmp_path / 'a.csv'), ['A'], mtime=1_000_000_000)
+    dataset = load_dataset(str(tmp_path))
+    assert dataset.source == str(tmp_path / 'a.csv')
+    write_ratings(str(tmp_path / 'b.csv'), ['B'], mtime=2_000_000_000)
+    # Hidden and partly written files are never picked up.
+    write_ratings(str(tmp_path / '.c.csv'), ['C'], mtime=3_000_000_000)
+    write_ratings(str(tmp_path / 'd.csv.tmp'), ['D'], mtime=3_000_000_000)
+    assert resolve_source(str(tmp_path)) == str(tmp_path / 'b.csv')
+    refresh_datasets()
+    refresh_datasets()
+    refreshed = load_dataset(str(tmp_path))
+    assert refreshed.source == str(tmp_path / 'b.csv') and refreshed.df['title'].tolist() == ['B']
+
+
+def test_refresh_loop_survives_errors_and_stops_without_interval(monkeypatch):
+    calls = []
+
+    def refresh():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError("broken source")
+        monkeypatch.setattr(data_loader, 'REFRESH_INTERVAL', None)
+
+    monkeypatch.setattr(data_loader, 'REFRESH_INTERVAL', 0.01)
+    monkeypatch.setattr(data_loader, 'refresh_datasets', refresh)
+    data_loader._refresh_loop()
+    assert len(calls) == 2
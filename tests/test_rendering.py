@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import plotly.tools
+
+from rendering import Chart, compact, downsample, lttb
+
+
+def test_lttb_keeps_ends_and_peaks():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[[137, 612]] = [50, -40]
+    chosen = lttb(x, y, 20)
+    assert len(chosen) == 20 and chosen[0] == 0 and chosen[-1] == 999
+    assert np.all(np.diff(chosen) > 0)
+    assert {137, 612} <= set(chosen.tolist())
+
+
+def test_short_series_unchanged():
+    assert lttb(np.arange(5), np.arange(5), 10).tolist() == [0, 1, 2, 3, 4]
+    data = pd.DataFrame({'x': range(10), 'y': range(10)})
+    assert downsample(data, 'x', 'y', max_points=20) is data
+    assert len(downsample(data, 'x', 'y', max_points=4)) == 4
+
+
+def test_chart_json_is_what_streamlit_sends():
+    # st.plotly_chart rebuilds the figure this way and serializes it again.
+    chart = Chart(compact(px.bar(pd.DataFrame({'title': ['A', 'B'], 'rating_count': [3, 5]}),
+                                 x='title', y='rating_count')))
+    figure = plotly.tools.return_figure_from_figure_or_data(chart.figure, validate_figure=True)
+    assert pio.to_json(figure, validate=False) == chart.json
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_loader
+from aggregates import get_sketches, tag_titles, top_titles, trending_titles
+from data_loader import load_dataset
+from sketches import SKETCH_EXACT, HeavyHitters
+from snapshot import GENRE_COLS
+
+
+@pytest.fixture(autouse=True)
+def inline_refresh(monkeypatch):
+    monkeypatch.setattr(data_loader, 'REFRESH_INTERVAL', None)
+
+
+def write_ratings(path, titles):
+    df = pd.DataFrame({
+        'userId': 1, 'movieId': range(len(titles)), 'title': titles, 'rating': 4.0, 'tag': 'tag', 'year': 2005,
+        'month': 1, 'day_of_week': 'Monday', 'rating_count': range(1, len(titles) + 1),
+    })
+    df.assign(**{genre: 1 for genre in GENRE_COLS}).to_csv(path, index=False)
+
+
+def sketch(titles, weights):
+    result = HeavyHitters()
+    result.add(titles, pd.util.hash_array(np.array(titles, dtype=object)), np.asarray(weights, dtype=np.float64))
+    return result
+
+
+def test_small_sketch_is_exact():
+    small = sketch(['a', 'b'], [3, 5])
+    assert small.table is None
+    top = HeavyHitters.combine([small, sketch(['a'], [4])]).top(2)
+    assert top['title'].tolist() == ['a', 'b'] and top['rating_count'].tolist() == [7, 5]
+    assert 'error_bound' not in top.attrs
+
+
+def test_sketch_allocates_table_past_exact_limit():
+    titles = ['t%d' % i for i in range(SKETCH_EXACT + 1)]
+    combined = HeavyHitters.combine([sketch(titles[:-1], range(1, SKETCH_EXACT + 1)), sketch(titles[-1:], [10 ** 6])])
+    assert combined.table is not None
+    top = combined.top(1)
+    assert top['title'].tolist() == [titles[-1]] and top['rating_count'].iloc[0] >= 10 ** 6
+    assert combined.total == sum(range(1, SKETCH_EXACT + 1)) + 10 ** 6
+
+
+def test_streamed_sketches_only_when_approximate(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    write_ratings(path, ['A', 'B', 'C'])
+    exact = load_dataset(path, chunksize=2)
+    with pytest.raises(ValueError):
+        get_sketches(exact)
+    approximate = load_dataset(path, chunksize=2, approximate=True)
+    assert approximate is not exact
+    assert top_titles(approximate, k=1, approximate=True)['title'].tolist() == ['C']
+    assert tag_titles(approximate, ['tag'], k=3, approximate=True)['rating_count'].tolist() == [3, 2, 1]
+
+
+def test_approximate_queries_without_sketches(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    write_ratings(path, ['A', 'B'])
+    dataset = load_dataset(path, columns=['year', 'title', 'rating_count', 'tag', 'Action'])
+    assert top_titles(dataset, genre='Comedy', approximate=True).empty
+    assert top_titles(dataset, year=1990, approximate=True).empty
+    assert not top_titles(dataset, genre='Action', approximate=True).empty
+
+    undated = str(tmp_path / 'undated.csv')
+    pd.read_csv(path).assign(year=None).to_csv(undated, index=False)
+    assert trending_titles(load_dataset(undated), approximate=True).empty
+
+
+def test_approximate_top_titles_on_skewed_input(tmp_path):
+    # Zipf-distributed rating counts over many more titles than SKETCH_EXACT,
+    # spread over several years, so the answers come from Count-Min tables.
+    rng = np.random.default_rng(0)
+    rows = 100_000
+    titles = ['Movie %d' % i for i in rng.zipf(1.1, rows) % rows]
+    path = str(tmp_path / 'ratings.csv')
+    pd.DataFrame({
+        'title': titles, 'year': rng.integers(1990, 2010, rows), 'rating_count': rng.integers(1, 10, rows),
+        'tag': 'tag', 'Drama': rng.integers(0, 2, rows),
+    }).to_csv(path, index=False)
+    dataset = load_dataset(path, columns=['title', 'year', 'rating_count', 'tag', 'Drama'])
+    for query in [{}, {'genre': 'Drama'}, {'year': 2000}]:
+        exact = top_titles(dataset, k=len(dataset.df), **query).set_index('title')['rating_count']
+        approximate = top_titles(dataset, k=6, approximate=True, **query)
+        assert approximate.attrs['error_bound'] < exact.iloc[5]
+        assert approximate['title'].tolist() == exact.index[:6].tolist()
+        true = exact[approximate['title']].to_numpy()
+        estimates = approximate['rating_count'].to_numpy()
+        assert (estimates >= true).all() and (estimates <= true + approximate.attrs['error_bound']).all()
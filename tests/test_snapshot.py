@@ -0,0 +1,57 @@
+import json
+import os
+
+import pandas as pd
+
+from snapshot import ARRAYS_META, GENRE_COLS, find_snapshot, read_csv_typed, read_snapshot, write_snapshot
+
+
+def write_ratings(path):
+    df = pd.DataFrame({
+        'userId': [1, 2, 3], 'movieId': [1, 2, None], 'title': ['A', 'B', 'A'], 'rating': [4.0, 3.5, None],
+        'tag': ['x', None, 'y'], 'year': [2005, None, 2001], 'month': [1, 2, 3],
+        'day_of_week': ['Monday', 'Sunday', None], 'rating_count': [10, 20, 30],
+    })
+    df.assign(**{genre: 1 for genre in GENRE_COLS}).to_csv(path, index=False)
+
+
+def test_arrays_snapshot_round_trip(tmp_path):
+    source = str(tmp_path / 'ratings.csv')
+    write_ratings(source)
+    path = write_snapshot(source, 'arrays')
+    assert find_snapshot(source) == path
+    with open(os.path.join(path, ARRAYS_META)) as f:
+        json.load(f)
+    assert not any(name.endswith('.pkl') for name in os.listdir(path))
+    expected = read_csv_typed(source).sort_values('year', kind='stable', na_position='last', ignore_index=True)
+    df = read_snapshot(path)
+    # Compared as objects: the snapshot columns are memory-mapped arrays.
+    pd.testing.assert_frame_equal(df.astype(object), expected.astype(object))
+    assert (df.dtypes == expected.dtypes).all()
+    assert df.attrs == expected.attrs
+    assert read_snapshot(path, ['title', 'Action']).columns.tolist() == ['title', 'genres']
+
+
+def test_arrays_snapshot_without_metadata_is_ignored(tmp_path):
+    source = str(tmp_path / 'ratings.csv')
+    write_ratings(source)
+    path = write_snapshot(source, 'arrays')
+    os.remove(os.path.join(path, ARRAYS_META))
+    assert find_snapshot(source) is None
+
+
+def test_arrays_snapshot_swaps_versions(tmp_path):
+    source = str(tmp_path / 'ratings.csv')
+    write_ratings(source)
+    path = write_snapshot(source, 'arrays')
+    first = os.path.realpath(path)
+    mapped = read_snapshot(path)
+    write_snapshot(source, 'arrays')
+    second = os.path.realpath(path)
+    assert os.path.islink(path) and second != first
+    # The replaced version stays for readers that resolved it before the swap.
+    assert os.path.isdir(first) and mapped['title'].tolist() == read_snapshot(path)['title'].tolist()
+    write_snapshot(source, 'arrays')
+    assert not os.path.exists(first) and os.path.isdir(second)
+    assert sorted(os.listdir(tmp_path)) == sorted(['ratings.csv', 'ratings.arrays', os.path.basename(second),
+                                                   os.path.basename(os.path.realpath(path))])
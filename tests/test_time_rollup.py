@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+import data_loader
+from aggregates import month_key, monthly_counts, rollup_months, weekly_counts
+from data_loader import load_dataset
+
+
+@pytest.fixture(autouse=True)
+def inline_refresh(monkeypatch):
+    monkeypatch.setattr(data_loader, 'REFRESH_INTERVAL', None)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    pd.DataFrame({
+        'year': [2005, 2005, 2005, 2006, 2006, None, 2005],
+        'month': [2, 3, 11, 1, 3, 2, 3],
+        'day_of_week': ['Monday', 'Monday', 'Friday', 'Sunday', 'Monday', 'Monday', 'Monday'],
+        'rating': [4.0, 3.0, 5.0, 2.0, 1.0, 4.0, None],
+        'Drama': [1, 0, 1, 1, 0, 1, 1],
+    }).to_csv(path, index=False)
+    return load_dataset(path, columns=['year', 'month', 'day_of_week', 'rating', 'Drama'])
+
+
+def counts(frame, key):
+    return dict(zip(frame[key].tolist(), frame['rating_count'].tolist()))
+
+
+def test_rollup_months(dataset):
+    assert rollup_months(dataset) == [month_key(2005, 2), month_key(2005, 3), month_key(2005, 11),
+                                      month_key(2006, 1), month_key(2006, 3)]
+
+
+def test_date_range_filter(dataset):
+    # Unrated rows are not counted; rows without a year only without a date range.
+    assert counts(monthly_counts(dataset), 'month') == {1: 1, 2: 2, 3: 2, 11: 1}
+    dates = (month_key(2005, 3), month_key(2006, 1))
+    assert counts(monthly_counts(dataset, dates=dates), 'month') == {1: 1, 3: 1, 11: 1}
+    assert counts(monthly_counts(dataset, genre='Drama', dates=dates), 'month') == {1: 1, 11: 1}
+    assert counts(monthly_counts(dataset, year=2006, dates=dates), 'month') == {1: 1}
+    weekly = counts(weekly_counts(dataset, dates=dates), 'day_of_week')
+    assert weekly['Monday'] == 1 and weekly['Friday'] == 1 and weekly['Sunday'] == 1 and sum(weekly.values()) == 3
+    assert monthly_counts(dataset, dates=(month_key(2010, 1), month_key(2010, 12))).empty
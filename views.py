@@ -0,0 +1,105 @@
+from aggregates import (genre_totals, has_time_rollup, monthly_counts, rating_trend, rollup_months, tag_titles,
+                        top_titles, trending_titles, weekly_counts)
+from metadata import write_metadata
+from metrics import filter_labels, span
+from snapshot import GENRE_MASK, VIEW_COLUMNS, genre_columns
+
+
+# === View registry ===
+# Each chart declares the filters it depends on and how to compute its data
+# from a dataset. Layouts only call ``run`` for the view that is on screen, so
+# the other charts cost nothing on a rerun.
+class View:
+    def __init__(self, name, inputs, compute):
+        self.name = name
+        self.inputs = inputs
+        self.compute = compute
+
+    @property
+    def columns(self):
+        return VIEW_COLUMNS[self.name]
+
+    def with_inputs(self, inputs):
+        return View(self.name, inputs, self.compute)
+
+    def run(self, dataset, filters):
+        with span('query', view=self.name, **filter_labels(filters)) as stage:
+            result = self.compute(dataset, **{key: filters[key] for key in self.inputs})
+            stage.rows = len(result)
+        return result
+
+
+VIEWS = {view.name: view for view in [
+    View('Top Movies', ('year', 'genre', 'approximate'),
+         lambda ds, year, genre, approximate, tags=None: top_titles(ds, year, genre, k=6, tags=tags,
+                                                                    approximate=approximate)),
+    View('Trending Now', ('approximate',),
+         lambda ds, approximate: trending_titles(ds, years=5, k=10, approximate=approximate)),
+    View('Average Rating Over Years', ('genre',),
+         lambda ds, genre: rating_trend(ds, genre)),
+    View('Genre Popularity', ('year', 'genre_cols'),
+         lambda ds, year, genre_cols: genre_totals(ds, genre_cols, year)),
+    View('Movies by Tags', ('tags', 'approximate'),
+         lambda ds, tags, approximate: tag_titles(ds, tags, k=10, approximate=approximate)),
+    View('Monthly Trends', ('year', 'genre', 'dates'),
+         monthly_counts),
+    View('Weekly Trends', ('year', 'genre', 'dates'),
+         weekly_counts),
+]}
+
+
+# === Widget options ===
+# ``tag_counts`` holds the number of ratings of each tag in ``tag``.
+def build_filter_options(dataset):
+    df = dataset.df
+    counts = df['tag'].value_counts(sort=False)
+    counts = dict(zip(counts.index.tolist(), counts.tolist()))
+    tags = sorted(tag for tag, count in counts.items() if count)
+    return {
+        'year': sorted(int(y) for y in df['year'].dropna().unique()),
+        'genre': genre_columns(df),
+        'tag': tags,
+        'tag_counts': [counts[tag] for tag in tags],
+    }
+
+
+def merge_filter_options(old, new):
+    counts = dict(zip(old['tag'], old['tag_counts']))
+    for tag, count in zip(new['tag'], new['tag_counts']):
+        counts[tag] = counts.get(tag, 0) + count
+    tags = sorted(counts)
+    return {
+        'year': sorted(set(old['year']).union(new['year'])),
+        'genre': old['genre'],
+        'tag': tags,
+        'tag_counts': [counts[tag] for tag in tags],
+    }
+
+
+def filter_options(dataset):
+    return dataset.derived('filter_options', build_filter_options, merge_filter_options)
+
+
+# === Metadata sidecar ===
+# The sidebar options (plus the months for the date-range slider when the
+# time rollup's columns are loaded), built once per dataset version and
+# written next to the source so a fresh process can draw the sidebar before
+# loading anything (see metadata.py, widgets.py).
+def build_metadata(dataset):
+    metadata = dict(filter_options(dataset))
+    if has_time_rollup(dataset.df):
+        metadata['months'] = rollup_months(dataset)
+    if dataset.signature is not None:
+        written = dict(metadata)
+        if GENRE_MASK not in dataset.df.columns:
+            del written['genre']
+        try:
+            write_metadata(dataset.path, dataset.source, dataset.signature, written)
+        except OSError:
+            # A read-only data directory: layouts then draw the sidebar after loading.
+            pass
+    return metadata
+
+
+def get_metadata(dataset):
+    return dataset.derived('metadata', build_metadata)
@@ -0,0 +1,102 @@
+import os
+import time
+
+import streamlit as st
+
+from metadata import ALL, read_metadata
+from metrics import record, snapshot
+
+# === Streamlit widgets ===
+# The sidebar is drawn from the metadata sidecar (see metadata.py), so this
+# module and everything it imports stay clear of pandas and plotly. Layouts
+# import dashboard_core, which loads them, only once the sidebar is up.
+
+# Views answered from the time rollup; their layouts get a date-range slider.
+ROLLUP_VIEWS = {'Monthly Trends', 'Weekly Trends'}
+
+
+def sidebar_options(path, views=None, chunksize=None, approximate=False):
+    """Sidebar options for ``path``: its metadata sidecar if that is current, else from loading the data.
+
+    ``views``, ``chunksize`` and ``approximate`` are the ones the layout opens the dataset with.
+    """
+    keys = ['year', 'genre', 'tag']
+    if views is None or ROLLUP_VIEWS.intersection(views):
+        keys.append('months')
+    options = read_metadata(os.path.abspath(path), keys)
+    if options is None:
+        # Imported here because it loads pandas and plotly.
+        from dashboard_core import get_metadata, open_dataset
+        load = {} if views is None else {'views': views}
+        options = get_metadata(open_dataset(path, chunksize=chunksize, approximate=approximate, **load))
+    return options
+
+
+def sidebar_filters(options, genre_cols=None, title="Filters", tag_label="Select Tags (multiple)",
+                    approximate=False, months=None):
+    """Year / genre / tag sidebar; returns the filters dict the views read.
+
+    With ``approximate`` the top-title views are answered from heavy-hitter
+    sketches (see sketches.py) instead of exact totals. ``months`` (see
+    aggregates.rollup_months) adds a date-range slider for the monthly and
+    weekly views.
+    """
+    genre_cols = [g for g in genre_cols or options['genre'] if g in options['genre']]
+    st.sidebar.title(title)
+    year = st.sidebar.selectbox("Select Year", [ALL] + options['year'])
+    genre = st.sidebar.selectbox("Select Genre", [ALL] + genre_cols)
+    tags = st.sidebar.multiselect(tag_label, options['tag'])
+    dates = date_range_slider(months) if months else None
+    cold_start('sidebar')
+    return {'year': year, 'genre': genre, 'tags': tags, 'genre_cols': genre_cols, 'approximate': approximate,
+            'dates': dates}
+
+
+def date_range_slider(months, label="Date Range"):
+    """(first, last) month keys picked on a sidebar slider, or None while the whole range is selected."""
+    if len(months) < 2:
+        return None
+    dates = st.sidebar.select_slider(label, options=months, value=(months[0], months[-1]),
+                                     format_func=lambda key: '%d-%02d' % (key // 12, key % 12 + 1))
+    return None if dates == (months[0], months[-1]) else tuple(dates)
+
+
+# === Cold start ===
+# Seconds from the first rerun in a fresh process (when this module is first
+# imported) to each of its milestones: 'sidebar' drawn, 'imports' of the
+# query and chart modules done, 'data' loaded and first 'chart' sent.
+# Recorded once per process under the 'cold_start' metrics stage.
+_started = time.perf_counter()
+_reached = set()
+
+
+def cold_start(milestone):
+    if milestone not in _reached:
+        _reached.add(milestone)
+        record('cold_start', time.perf_counter() - _started, milestone=milestone)
+
+
+# === Diagnostics ===
+def diagnostics_page():
+    """Show the hidden diagnostics page if the URL has ``?diagnostics`` (``=prometheus`` for raw text).
+
+    Returns whether it was shown; layouts stop there.
+    """
+    mode = st.query_params.get('diagnostics')
+    if mode is None:
+        return False
+    from dashboard_core import metrics_text
+    from figure_cache import FIGURES
+    from rendering import bytes_sent
+    if mode == 'prometheus':
+        st.code(metrics_text(), language='text')
+        return True
+    st.title("Diagnostics")
+    st.subheader("Stage timings (seconds)")
+    st.dataframe([dict(entry.pop('labels'), **entry) for entry in snapshot()], use_container_width=True)
+    st.subheader("Figure cache")
+    st.json(FIGURES.stats())
+    st.subheader("Chart payload sent (estimated from the figure JSON)")
+    st.dataframe([dict(layout=layout, view=view, **s) for (layout, view), s in bytes_sent().items()],
+                 use_container_width=True)
+    return True